@@ -0,0 +1,341 @@
+"""
+Asyncio serving mode. Requires Python 3.7+ and an ASGI server, for example:
+
+    uvicorn asgi_server:app
+
+Compiles run as asyncio subprocesses, or as requests to remote workers over
+asyncio streams, so a waiting request costs an event loop task instead of a
+thread. server.py remains the WSGI entry point.
+"""
+import config
+
+import ivernetp
+from ivernetp.process_netlist import GRAPH_FORMATS
+from executors import (make_executor, make_paths, write_sources, read_outputs,
+                       compile_commands, compiler_message, compile_message,
+                       unpack_response, parse_outputs, CompileError,
+                       CompileTimeoutError, CompileWorkerError, OUTPUTS,
+                       DEFAULT_OUTPUTS)
+from result_store import make_result_store, content_hash
+from single_flight import AsyncSingleFlight
+
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+
+result_store = make_result_store()
+in_flight = AsyncSingleFlight()
+compile_slots = None  # asyncio.Semaphore, created on first use
+
+if config.Compiler.EXECUTOR == 'remote':
+    remote_executor = make_executor()
+else:
+    remote_executor = None
+
+# Longest response line accepted from a remote worker. Responses hold whole
+# netlists and waveforms, so this is far above asyncio's 64 KiB default.
+MAX_RESPONSE_BYTES = 1 << 30
+
+CORS_HEADERS = [(b'access-control-allow-origin', b'*'),
+                (b'access-control-allow-headers', b'Content-Type')]
+
+
+async def run_until(cmd, cwd, deadline, stdout=None, stderr=None):
+    """
+    Run a command, killing it if it is still running at deadline (in event
+    loop time). stdout and stderr are passed to the subprocess as in
+    subprocess.Popen.
+
+    The process is killed if this coroutine is cancelled.
+
+    Returns its stdout if stdout is subprocess.PIPE.
+    Raises CompileTimeoutError if the deadline passes.
+    Raises subprocess.CalledProcessError if it exits with a nonzero status.
+    """
+    loop = asyncio.get_running_loop()
+    proc = await asyncio.create_subprocess_exec(*cmd, cwd=cwd, stdout=stdout,
+                                                stderr=stderr)
+    try:
+        output, _ = await asyncio.wait_for(proc.communicate(),
+                                           deadline - loop.time())
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise CompileTimeoutError
+    except asyncio.CancelledError:
+        proc.kill()
+        raise
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output)
+    return output
+
+
+async def compile_local(module, testbench, timeout_secs,
+                        outputs=DEFAULT_OUTPUTS):
+    """
+    The asyncio counterpart of LocalExecutor.compile().
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_secs
+    temp_dir = tempfile.mkdtemp(prefix=config.Misc.TEMP_DIR_PREFIX)
+
+    try:
+        paths = make_paths(temp_dir)
+        write_sources(paths, module, testbench)
+        iverilog_cmd, vvp_cmd = compile_commands(paths, outputs)
+        try:
+            await run_until(iverilog_cmd, temp_dir, deadline,
+                            subprocess.PIPE, subprocess.STDOUT)
+        except subprocess.CalledProcessError as e:
+            raise CompileError(compiler_message(e.output, paths))
+
+        stdout = None
+        try:
+            if vvp_cmd and 'stdout' in outputs:
+                stdout = await run_until(vvp_cmd, temp_dir, deadline,
+                                         subprocess.PIPE)
+                stdout = stdout.decode('utf-8')
+            elif vvp_cmd:
+                await run_until(vvp_cmd, temp_dir, deadline,
+                                subprocess.DEVNULL)
+        except subprocess.CalledProcessError as e:
+            raise CompileError('Simulation exited with status %s' %
+                               e.returncode)
+        return await loop.run_in_executor(None, read_outputs, paths, stdout,
+                                          outputs)
+
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+async def request_worker(worker, message, timeout_secs):
+    """
+    Send one message to a RemoteWorker over asyncio streams.
+
+    Returns the response.
+    Raises OSError or asyncio.TimeoutError if the worker can't be connected
+    to within config.Compiler.HEALTH_CHECK_TIMEOUT.
+    Raises CompileTimeoutError if no response arrives within timeout_secs.
+    Raises CompileWorkerError if the connection fails after that.
+    """
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(worker.host, worker.port,
+                                limit=MAX_RESPONSE_BYTES),
+        config.Compiler.HEALTH_CHECK_TIMEOUT)
+    worker.healthy = True
+    try:
+        writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout_secs)
+        if not line:
+            raise ConnectionError('Connection closed before a message '
+                                  'arrived')
+        return json.loads(line.decode('utf-8'))
+    except asyncio.TimeoutError:
+        raise CompileTimeoutError
+    except (OSError, ValueError):
+        raise CompileWorkerError('Lost connection to compile worker')
+    finally:
+        writer.close()
+
+
+async def compile_remote(module, testbench, timeout_secs,
+                         outputs=DEFAULT_OUTPUTS):
+    """
+    The asyncio counterpart of RemoteExecutor.compile(), using the workers
+    and health checks of remote_executor. Waiting for a worker holds no
+    thread.
+    """
+    message = compile_message(module, testbench, timeout_secs, outputs)
+    request_timeout = timeout_secs + config.Compiler.REMOTE_TIMEOUT_SLACK
+    tried = set()
+    while True:
+        worker = remote_executor.acquire_worker(tried)
+        if worker is None:
+            raise CompileWorkerError('No compile workers available')
+        tried.add(worker)
+        try:
+            response = await request_worker(worker, message, request_timeout)
+        except (OSError, asyncio.TimeoutError):
+            worker.healthy = False
+            continue
+        finally:
+            remote_executor.release_worker(worker)
+        if response.get('error') == 'busy':
+            continue
+        return unpack_response(response)
+
+
+async def run_compile(key, module, testbench, timeout_secs, graph_format,
+                      outputs):
+    global compile_slots
+    loop = asyncio.get_running_loop()
+    if remote_executor:
+        start_time = time.time()
+        result = await compile_remote(module, testbench, timeout_secs,
+                                      outputs)
+        end_time = time.time()
+    else:
+        if compile_slots is None:
+            slots = (config.Async.MAX_CONCURRENT_COMPILES or
+                     os.cpu_count() or 1)
+            compile_slots = asyncio.Semaphore(slots)
+        # Time spent waiting for a slot doesn't count against the timeout
+        async with compile_slots:
+            start_time = time.time()
+            result = await compile_local(module, testbench, timeout_secs,
+                                         outputs)
+            end_time = time.time()
+
+    output = {}
+    if 'stdout' in outputs:
+        output['stdout'] = result['stdout']
+    if 'waveform' in outputs:
+        output['waveform'] = result['waveform']
+    if 'waveform_summary' in outputs:
+        output['waveform_summary'] = result['waveform_summary']
+    if 'netlist' in outputs:
+        output['netlist'] = await loop.run_in_executor(
+            None, ivernetp.process_netlist.netlist_to_json,
+            result['netlist'], config.Netlist.PARALLEL_PARSE_THRESHOLD,
+            config.Netlist.PARALLEL_PARSE_PROCESSES, graph_format)
+    if 'timing' in outputs:
+        output['seconds'] = end_time - start_time
+
+    if result_store:
+        await loop.run_in_executor(None, result_store.put, 'compile', key,
+                                   output)
+    return output
+
+
+async def send_response(send, status, body,
+                        content_type=b'application/json'):
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    headers = [(b'content-type', content_type),
+               (b'content-length', str(len(body)).encode('ascii'))]
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': headers + CORS_HEADERS})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, status, data):
+    await send_response(send, status, json.dumps(data))
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def about(receive, send):
+    version = '.'.join([str(x) for x in config.Metadata.VERSION])
+    await send_json(send, 200, {'name': config.Metadata.NAME,
+                                'version': version,
+                                'contact': config.Metadata.CONTACT})
+
+
+async def compile(receive, send):
+    try:
+        posted = json.loads((await read_body(receive)).decode('utf-8'))
+    except ValueError:
+        await send_response(send, 400, 'Posted body is not valid JSON',
+                            b'text/html; charset=utf-8')
+        return
+
+    for arg in ('module', 'testbench'):
+        if arg not in posted:
+            await send_response(send, 400,
+                                'Argument %s not found in posted JSON' % arg,
+                                b'text/html; charset=utf-8')
+            return
+
+    graph_format = posted.get('graph_format', 'full')
+    if graph_format not in GRAPH_FORMATS:
+        await send_response(send, 400,
+                            'Invalid graph_format: %s' % graph_format,
+                            b'text/html; charset=utf-8')
+        return
+
+    outputs = parse_outputs(posted)
+    if outputs is None:
+        await send_response(send, 400,
+                            'Argument outputs must be a list of %s' %
+                            ', '.join(OUTPUTS), b'text/html; charset=utf-8')
+        return
+
+    loop = asyncio.get_running_loop()
+    key = content_hash(posted['module'], posted['testbench'], graph_format,
+                       ','.join(outputs))
+    if result_store:
+        cached = await loop.run_in_executor(None, result_store.get,
+                                            'compile', key)
+        if cached is not None:
+            await send_json(send, 200, cached)
+            return
+
+    timeout_secs = config.Compiler.COMPILE_TIMEOUT
+    try:
+        output = await in_flight.do(key, run_compile, key, posted['module'],
+                                    posted['testbench'], timeout_secs,
+                                    graph_format, outputs)
+    except CompileTimeoutError:
+        err = {'error': 'Compile process took too long; '
+                        'max time is %s seconds' % timeout_secs}
+        await send_json(send, 409, err)
+        return
+    except CompileError as e:
+        await send_json(send, 422, {'error': str(e)})
+        return
+    except CompileWorkerError as e:
+        await send_json(send, 503, {'error': str(e)})
+        return
+    await send_json(send, 200, output)
+
+
+ROUTES = {
+    '/': (('GET', 'HEAD'), about),
+    '/compile': (('POST',), compile),
+}
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    route = ROUTES.get(scope['path'])
+    if route is None:
+        await send_response(send, 404, 'Not Found', b'text/plain')
+        return
+    methods, handler = route
+    if scope['method'] == 'OPTIONS':
+        await send_response(send, 200, '', b'text/plain')
+    elif scope['method'] not in methods:
+        await send_response(send, 405, 'Method Not Allowed', b'text/plain')
+    else:
+        await handler(receive, send)
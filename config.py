@@ -5,6 +5,46 @@ class Flask:
 
 class Compiler:
     COMPILE_TIMEOUT = 0.5  # seconds
+    EXECUTOR = 'local'  # 'local' or 'remote'
+    # (host, port) pairs of worker.py daemons used by the remote executor
+    REMOTE_WORKERS = []
+    REMOTE_TIMEOUT_SLACK = 2  # seconds on top of COMPILE_TIMEOUT
+    HEALTH_CHECK_INTERVAL = 5  # seconds; None disables
+    HEALTH_CHECK_TIMEOUT = 1  # seconds
+
+
+class Async:
+    # Local compiles allowed to run at once in the asyncio serving mode.
+    # Requests beyond this wait without holding a thread. None uses
+    # os.cpu_count(). Remote compiles are limited by the worker pool instead.
+    MAX_CONCURRENT_COMPILES = None
+
+
+class Worker:
+    # Workers run compiles for anyone who can connect, so they only listen
+    # locally unless started with --host.
+    HOST = '127.0.0.1'
+    PORT = 7100
+    # Compiles a worker runs at once. Requests beyond this are turned away
+    # as busy and tried on another worker. None uses os.cpu_count().
+    MAX_CONCURRENT_COMPILES = None
+
+
+class Netlist:
+    # Parse netlists longer than this many characters in a process pool.
+    # None keeps parsing single-threaded. Each server process starts one
+    # pool on first use and keeps it.
+    PARALLEL_PARSE_THRESHOLD = None
+    PARALLEL_PARSE_PROCESSES = None  # None uses os.cpu_count()
+
+
+class ResultStore:
+    # SQLite file shared by all server processes on this node. None disables
+    # result caching. Put it in a directory only the server's user can write
+    # to, or other local users could plant results in it.
+    PATH = None
+    TTL = 60 * 60  # seconds
+    MAX_BYTES = 256 * 1024 * 1024
 
 
 class Metadata:
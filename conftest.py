@@ -0,0 +1,100 @@
+from executors import RemoteWorker
+
+from os import path
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+
+TEST_NETLIST = path.join(path.dirname(path.abspath(__file__)),
+                         'ivernetp', 'test.netlist')
+WORKER_SCRIPT = path.join(path.dirname(path.abspath(__file__)), 'worker.py')
+
+# Stand-ins for iverilog and vvp. iverilog fails on modules containing
+# "syntax_error" and logs each call to calls.log next to itself; vvp
+# sleeps for 0.2s on modules containing "slow" and prints $WORKER_NAME.
+FAKE_IVERILOG = """#!{python}
+import os, shutil, sys
+args = sys.argv[1:]
+with open(os.path.join(os.path.dirname(sys.argv[0]), 'calls.log'), 'a') as f:
+    f.write('iverilog\\n')
+if 'syntax_error' in open(args[-2]).read():
+    sys.stderr.write(args[-2] + ':1: syntax error\\n')
+    sys.exit(2)
+if '-N' in args:
+    shutil.copy({netlist!r}, args[args.index('-N') + 1])
+open(args[args.index('-o') + 1], 'w').write('compiled')
+"""
+
+FAKE_VVP = """#!{python}
+import os, time
+if 'slow' in open('module.v').read():
+    time.sleep(0.2)
+print(os.environ.get('WORKER_NAME', 'local'))
+"""
+
+
+def write_script(script_path, source):
+    with open(script_path, 'w') as f:
+        f.write(source.format(python=sys.executable, netlist=TEST_NETLIST))
+    os.chmod(script_path, 0o755)
+
+
+@pytest.fixture
+def fake_tools(tmpdir, monkeypatch):
+    """
+    Put fake iverilog and vvp first on PATH. Returns their directory.
+    """
+    bin_dir = str(tmpdir.mkdir('bin'))
+    write_script(path.join(bin_dir, 'iverilog'), FAKE_IVERILOG)
+    write_script(path.join(bin_dir, 'vvp'), FAKE_VVP)
+    monkeypatch.setenv('PATH', bin_dir + os.pathsep + os.environ['PATH'])
+    return bin_dir
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_worker(name, max_compiles=4, max_timeout=5):
+    """
+    Start worker.py on a free local port, with its Compiler.COMPILE_TIMEOUT
+    set to max_timeout.
+
+    Returns a tuple: (process, (host, port))
+    """
+    port = free_port()
+    env = dict(os.environ, WORKER_NAME=name)
+    code = ('import config, worker; '
+            'config.Compiler.COMPILE_TIMEOUT = %r; worker.main()' %
+            max_timeout)
+    process = subprocess.Popen([sys.executable, '-c', code,
+                                '--port', str(port),
+                                '--max-compiles', str(max_compiles)],
+                               cwd=path.dirname(WORKER_SCRIPT), env=env)
+    worker = RemoteWorker('127.0.0.1', port)
+    for _ in range(100):
+        if worker.ping():
+            return process, ('127.0.0.1', port)
+        time.sleep(0.05)
+    process.kill()
+    raise RuntimeError('Worker %s did not start' % name)
+
+
+@pytest.fixture
+def workers(fake_tools):
+    """
+    Start two worker.py processes using the fake tools, whose simulation
+    stdout is the name of the worker that ran it.
+    """
+    started = [start_worker(name) for name in ('a', 'b')]
+    yield started
+    for process, _ in started:
+        process.kill()
+        process.wait()
@@ -0,0 +1,402 @@
+import config
+
+from vcd_summary import summarize_vcd
+
+import json
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from os import path
+from multiprocessing import Process, Queue
+
+
+class CompileTimeoutError(Exception):
+    pass
+
+
+class CompileWorkerError(Exception):
+    pass
+
+
+class CompileError(Exception):
+    """
+    The submitted Verilog failed to compile or simulate. The message is the
+    compiler output, with server temp paths removed.
+    """
+    pass
+
+
+# Outputs a compile can produce. Callers pass the subset they want so the
+# work for the others can be skipped.
+OUTPUTS = ('stdout', 'netlist', 'waveform', 'waveform_summary', 'timing')
+# Produced when a request doesn't list its outputs
+DEFAULT_OUTPUTS = ('stdout', 'netlist', 'waveform', 'timing')
+# Outputs that need the simulation to run
+SIMULATION_OUTPUTS = ('stdout', 'waveform', 'waveform_summary')
+
+
+def parse_outputs(posted):
+    """
+    Read the optional 'outputs' list from posted JSON. DEFAULT_OUTPUTS are
+    produced if it is missing.
+
+    Returns the requested outputs as a tuple in OUTPUTS order, or None if
+    'outputs' isn't a list of names from OUTPUTS.
+    """
+    requested = posted.get('outputs')
+    if requested is None:
+        return DEFAULT_OUTPUTS
+    if not isinstance(requested, list):
+        return None
+    if any(o not in OUTPUTS for o in requested):
+        return None
+    return tuple(o for o in OUTPUTS if o in requested)
+
+
+def compile_commands(paths, outputs):
+    """
+    Build the iverilog and vvp command lines for the requested outputs.
+    iverilog only writes a netlist if one was requested, and vvp's -none
+    extended argument turns off waveform dumping when neither the waveform
+    nor its summary was requested.
+
+    Returns a tuple: (iverilog_cmd, vvp_cmd)
+    vvp_cmd is None if no requested output needs the simulation to run.
+    """
+    iverilog_cmd = ['iverilog']
+    if 'netlist' in outputs:
+        iverilog_cmd += ['-N', paths['netlist']]
+    iverilog_cmd += ['-o', paths['compiled'], paths['module'],
+                     paths['testbench']]
+    if not any(o in outputs for o in SIMULATION_OUTPUTS):
+        return iverilog_cmd, None
+    vvp_cmd = ['vvp', paths['compiled']]
+    if 'waveform' not in outputs and 'waveform_summary' not in outputs:
+        vvp_cmd.append('-none')
+    return iverilog_cmd, vvp_cmd
+
+
+def compiler_message(output, paths):
+    """
+    Decode compiler output for a CompileError, stripping the temp dir from
+    the file paths in it.
+    """
+    message = output.decode('utf-8', 'replace')
+    return message.replace(paths['temp_dir'] + path.sep, '').strip()
+
+
+def compile_task(paths, result_queue, outputs=DEFAULT_OUTPUTS):
+    iverilog_cmd, vvp_cmd = compile_commands(paths, outputs)
+    try:
+        subprocess.check_output(iverilog_cmd, cwd=paths['temp_dir'],
+                                stderr=subprocess.STDOUT)
+    except subprocess.CalledProcessError as e:
+        result_queue.put((compiler_message(e.output, paths), None))
+        return
+
+    stdout = None
+    try:
+        if vvp_cmd and 'stdout' in outputs:
+            stdout = (subprocess.check_output(vvp_cmd, cwd=paths['temp_dir'])
+                      .decode('utf-8'))
+        elif vvp_cmd:
+            subprocess.check_call(vvp_cmd, cwd=paths['temp_dir'],
+                                  stdout=subprocess.DEVNULL)
+    except subprocess.CalledProcessError as e:
+        result_queue.put(('Simulation exited with status %s' % e.returncode,
+                          None))
+    else:
+        result_queue.put((None, stdout))
+
+
+def compile_with_timeout(paths, timeout_secs, outputs=DEFAULT_OUTPUTS):
+    """
+    Run compile_task in a subprocess.
+
+    Returns the simulation stdout, or None if it wasn't requested.
+    Raises CompileTimeoutError if it takes longer than timeout_secs.
+    Raises CompileError if compiling or simulating fails.
+    """
+    result_queue = Queue()
+    args = (paths, result_queue, outputs)
+    compile_process = Process(target=compile_task, args=args)
+    compile_process.start()
+    compile_process.join(timeout_secs)
+
+    if compile_process.is_alive():
+        compile_process.terminate()
+        raise CompileTimeoutError
+
+    error, stdout = result_queue.get()
+    if error is not None:
+        raise CompileError(error)
+    return stdout
+
+
+def make_paths(temp_dir):
+    return {
+        'temp_dir': temp_dir,
+        'module': path.join(temp_dir, 'module.v'),
+        'testbench': path.join(temp_dir, 'testbench.v'),
+        'netlist': path.join(temp_dir, 'netlist'),
+        'compiled': path.join(temp_dir, 'compiled.vvp'),
+        'waveform': path.join(temp_dir, 'waveform.vcd')
+    }
+
+
+def write_sources(paths, module, testbench):
+    with open(paths['module'], 'w') as f:
+        f.write(module)
+    with open(paths['testbench'], 'w') as f:
+        f.write(testbench)
+
+
+def read_outputs(paths, stdout, outputs=DEFAULT_OUTPUTS):
+    """
+    Collect the results of a finished compile into the dict returned by
+    executors. netlist, waveform and waveform_summary are None if they
+    weren't requested, and the waveform ones are also None if the testbench
+    didn't dump one.
+
+    waveform_summary is computed by streaming the dump through
+    summarize_vcd(), so the dump is only read into memory if the full
+    waveform was requested.
+    """
+    netlist = None
+    if 'netlist' in outputs:
+        with open(paths['netlist']) as f:
+            netlist = f.read()
+
+    waveform = None
+    if 'waveform' in outputs:
+        try:
+            with open(paths['waveform']) as f:
+                waveform = f.read()
+        except OSError:
+            pass
+
+    waveform_summary = None
+    if 'waveform_summary' in outputs:
+        try:
+            with open(paths['waveform']) as f:
+                waveform_summary = summarize_vcd(f)
+        except OSError:
+            pass
+
+    return {'stdout': stdout, 'netlist': netlist, 'waveform': waveform,
+            'waveform_summary': waveform_summary}
+
+
+def send_message(sock_file, message):
+    """
+    Write a message to a socket file as a single line of JSON.
+    """
+    sock_file.write(json.dumps(message).encode('utf-8') + b'\n')
+    sock_file.flush()
+
+
+def receive_message(sock_file):
+    """
+    Read a single line of JSON from a socket file.
+
+    Raises ConnectionError if the other end closed the connection.
+    """
+    line = sock_file.readline()
+    if not line:
+        raise ConnectionError('Connection closed before a message arrived')
+    return json.loads(line.decode('utf-8'))
+
+
+class LocalExecutor:
+    """
+    Runs iverilog and vvp in a subprocess on this host.
+
+    compile() returns a dict with the simulation stdout and the raw netlist
+    and waveform text. waveform is None if the testbench didn't dump one.
+    """
+    def compile(self, module, testbench, timeout_secs,
+                outputs=DEFAULT_OUTPUTS):
+        temp_dir = tempfile.mkdtemp(prefix=config.Misc.TEMP_DIR_PREFIX)
+
+        try:
+            paths = make_paths(temp_dir)
+            write_sources(paths, module, testbench)
+            stdout = compile_with_timeout(paths, timeout_secs, outputs)
+            return read_outputs(paths, stdout, outputs)
+
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class RemoteWorker:
+    """
+    A compile worker daemon (see worker.py) reachable over TCP.
+
+    healthy: False once connecting to this worker or a health check has
+        failed, until a later connection or health check succeeds.
+
+    in_flight: the number of compile requests currently sent to this worker.
+    """
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.healthy = True
+        self.in_flight = 0
+
+    def connect(self, timeout_secs):
+        """
+        Open a connection to the worker.
+
+        Raises OSError if the worker can't be reached within timeout_secs.
+        """
+        address = (self.host, self.port)
+        return socket.create_connection(address, timeout=timeout_secs)
+
+    def request(self, sock, message, timeout_secs):
+        """
+        Send a message over a connection from connect() and wait for the
+        response.
+
+        Raises socket.timeout if no response arrives within timeout_secs.
+        """
+        sock.settimeout(timeout_secs)
+        with sock.makefile('rwb') as sock_file:
+            send_message(sock_file, message)
+            return receive_message(sock_file)
+
+    def ping(self):
+        timeout_secs = config.Compiler.HEALTH_CHECK_TIMEOUT
+        try:
+            with self.connect(timeout_secs) as sock:
+                response = self.request(sock, {'op': 'ping'}, timeout_secs)
+            self.healthy = bool(response.get('ok'))
+        except (OSError, ValueError):
+            self.healthy = False
+        return self.healthy
+
+    def __repr__(self):
+        state = 'healthy' if self.healthy else 'unhealthy'
+        return '<RemoteWorker: %s:%s %s (%s in flight)>' % (
+            self.host, self.port, state, self.in_flight)
+
+
+class RemoteExecutor:
+    """
+    Sends compile jobs to a pool of worker daemons.
+
+    Each job goes to the healthy worker with the fewest jobs in flight. If a
+    worker can't be connected to, it is marked unhealthy and the job is
+    retried on the next worker. Jobs a worker turns away as busy are also
+    retried elsewhere. Once a worker has started a job, the job isn't
+    retried: a worker that doesn't answer in time is reported as a
+    CompileTimeoutError, since it is most likely busy rather than down.
+    If health_check_interval is set, a background thread pings every worker
+    on that interval so unhealthy workers can rejoin the pool.
+    """
+    def __init__(self, workers, health_check_interval=None):
+        self.workers = [RemoteWorker(host, port) for host, port in workers]
+        self.lock = threading.Lock()
+        if health_check_interval:
+            thread = threading.Thread(target=self._health_check_loop,
+                                      args=(health_check_interval,),
+                                      daemon=True)
+            thread.start()
+
+    def check_health(self):
+        for worker in self.workers:
+            worker.ping()
+
+    def _health_check_loop(self, interval):
+        while True:
+            self.check_health()
+            time.sleep(interval)
+
+    def acquire_worker(self, tried):
+        """
+        Pick the worker for a job, skipping the workers in tried, and count
+        the job as in flight on it. Release it with release_worker().
+
+        Returns a RemoteWorker, or None if every worker has been tried.
+        """
+        with self.lock:
+            candidates = [w for w in self.workers if w not in tried]
+            healthy = [w for w in candidates if w.healthy]
+            # Fall back to unhealthy workers rather than failing outright;
+            # they may have recovered since they were last checked.
+            candidates = healthy or candidates
+            if not candidates:
+                return None
+            worker = min(candidates, key=lambda w: w.in_flight)
+            worker.in_flight += 1
+            return worker
+
+    def release_worker(self, worker):
+        with self.lock:
+            worker.in_flight -= 1
+
+    def compile(self, module, testbench, timeout_secs,
+                outputs=DEFAULT_OUTPUTS):
+        message = compile_message(module, testbench, timeout_secs, outputs)
+        request_timeout = timeout_secs + config.Compiler.REMOTE_TIMEOUT_SLACK
+        tried = set()
+        while True:
+            worker = self.acquire_worker(tried)
+            if worker is None:
+                raise CompileWorkerError('No compile workers available')
+            tried.add(worker)
+            try:
+                sock = worker.connect(config.Compiler.HEALTH_CHECK_TIMEOUT)
+            except OSError:
+                self.release_worker(worker)
+                worker.healthy = False
+                continue
+            worker.healthy = True
+            try:
+                with sock:
+                    response = worker.request(sock, message, request_timeout)
+            except socket.timeout:
+                raise CompileTimeoutError
+            except (OSError, ValueError):
+                raise CompileWorkerError('Lost connection to compile worker')
+            finally:
+                self.release_worker(worker)
+            if response.get('error') == 'busy':
+                continue
+            return unpack_response(response)
+
+
+def compile_message(module, testbench, timeout_secs, outputs):
+    """
+    Build the compile request sent to a worker daemon.
+    """
+    return {'op': 'compile', 'module': module, 'testbench': testbench,
+            'timeout': timeout_secs, 'outputs': list(outputs)}
+
+
+def unpack_response(response):
+    """
+    Turn a compile response from a worker daemon back into a result dict, or
+    raise the error the worker reported.
+    """
+    if response.get('ok'):
+        return response['result']
+    if response.get('error') == 'timeout':
+        raise CompileTimeoutError
+    if response.get('error') == 'compile_error':
+        raise CompileError(response.get('message', ''))
+    raise CompileWorkerError(response.get('message', 'Compile worker error'))
+
+
+def make_executor():
+    """
+    Build the executor selected by config.Compiler.EXECUTOR.
+    """
+    if config.Compiler.EXECUTOR == 'local':
+        return LocalExecutor()
+    if config.Compiler.EXECUTOR == 'remote':
+        return RemoteExecutor(config.Compiler.REMOTE_WORKERS,
+                              config.Compiler.HEALTH_CHECK_INTERVAL)
+    raise ValueError('Invalid executor: %s' % config.Compiler.EXECUTOR)
@@ -1,3 +1,4 @@
+from . import cli
 from . import ivl_elabs
 from . import ivl_enums
 from . import ivl_structures
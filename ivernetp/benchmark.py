@@ -0,0 +1,93 @@
+"""
+Compare single-threaded and parallel parsing on a generated netlist:
+
+    python -m ivernetp.benchmark --stages 100000 -j 1 2 4 8
+
+For each process count this reports the wall time and the CPU time spent
+in this process. Work that stays in this process (cutting the text into
+chunks, merging net tables and building objects) doesn't get faster with
+more processes, so the parent CPU time bounds the speedup.
+"""
+from .parsers import parse_modules_and_elabs, get_pool
+from .utils import IvlNetManager
+
+import argparse
+import os
+import time
+
+
+def chain_netlist(stages):
+    """
+    Build a netlist of stages connected in a chain, each stage's out port
+    sharing a net with the next stage's in port, with a not gate between
+    each stage's nets.
+    """
+    port = ('    wire: %s[0:0 count=1] logic %s (eref=0, lref=0) scope=%s '
+            '#(0x0,0x0,0x0) vector_width=1 pin_count=1 init=z (x)\n'
+            '        [0]: 0x%x chain.n%s\n')
+    gate = ('logic: not #(0x0,0x0,0x0) o0<0.0> scope=chain.s%s\n'
+            '    0 pin0 O (strong0 strong1): 0x%x chain.n%s\n'
+            '    1 pin1 I (strong0 strong1): 0x%x chain.n%s\n')
+    lines = ['SCOPES:\n', 'chain module <chain> instance\n']
+    for i in range(stages):
+        scope = 'chain.s%s' % i
+        lines.append('%s module <stage> instance\n' % scope)
+        lines.append(port % ('in', 'input', scope, i, i))
+        lines.append(port % ('out', 'output', scope, i + 1, i + 1))
+    lines.append('ELABORATED NODES:\n')
+    for i in range(stages):
+        lines.append(gate % (i, i + 1, i + 1, i, i))
+    lines.append('ELABORATED BRANCHES:\n')
+    return ''.join(lines)
+
+
+def time_parse(raw_netlist, processes=None):
+    """
+    Parse raw_netlist, in parallel if processes is set.
+
+    Returns a tuple: (wall seconds, CPU seconds in this process)
+    """
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    if processes:
+        parse_modules_and_elabs(raw_netlist, IvlNetManager(),
+                                parallel_threshold=0, processes=processes)
+    else:
+        parse_modules_and_elabs(raw_netlist, IvlNetManager())
+    return time.perf_counter() - start_wall, time.process_time() - start_cpu
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m ivernetp.benchmark',
+        description='Time single-threaded and parallel netlist parsing.')
+    parser.add_argument('--stages', type=int, default=100000,
+                        help='modules in the generated netlist '
+                             '(default: %(default)s)')
+    parser.add_argument('-j', '--processes', type=int, nargs='+',
+                        default=[os.cpu_count() or 1],
+                        help='process counts to try (default: CPU count)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='runs per setting; the fastest is reported '
+                             '(default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    raw_netlist = chain_netlist(args.stages)
+    print('%d stages, %.1f MB, %s CPUs' % (
+        args.stages, len(raw_netlist) / 1e6, os.cpu_count()))
+    for processes in args.processes:
+        get_pool(processes)  # Don't count pool startup
+
+    serial_wall, serial_cpu = min(time_parse(raw_netlist)
+                                  for _ in range(args.repeat))
+    print('serial:      %.2fs wall, %.2fs parent CPU' % (serial_wall,
+                                                         serial_cpu))
+    for processes in args.processes:
+        wall, cpu = min(time_parse(raw_netlist, processes)
+                        for _ in range(args.repeat))
+        print('%2d processes: %.2fs wall, %.2fs parent CPU, %.2fx' % (
+            processes, wall, cpu, serial_wall / wall))
+
+
+if __name__ == '__main__':
+    main()
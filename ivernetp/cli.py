@@ -0,0 +1,195 @@
+from .process_netlist import (GRAPH_FORMATS, parse_netlist, build_graph,
+                              build_compact_graph)
+
+from multiprocessing import Pool
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import time
+
+
+def output_name(file_path):
+    """
+    Name a netlist's output after its path as given, made relative so it
+    stays inside the output directory: the drive, root and any '..'
+    components are dropped.
+    """
+    normalized = os.path.normpath(os.path.splitdrive(file_path)[1])
+    parts = [p for p in normalized.split(os.sep) if p not in ('', '.', '..')]
+    return os.path.join(*parts)
+
+
+def find_netlists(sources, pattern):
+    """
+    Expand the sources given on the command line into (path, output name)
+    pairs. Output names come from output_name(), so files with the same
+    name in different directories don't overwrite each other.
+
+    Directories are walked recursively for files matching pattern.
+    A source of '-' reads one path per line from stdin.
+    """
+    for source in sources:
+        if source == '-':
+            for line in sys.stdin:
+                line = line.strip()
+                if line:
+                    yield line, output_name(line)
+        elif os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(fnmatch.filter(files, pattern)):
+                    file_path = os.path.join(root, name)
+                    yield file_path, output_name(file_path)
+        else:
+            yield source, output_name(source)
+
+
+def find_duplicate_names(netlists):
+    """
+    Returns the output names shared by more than one of the (path, output
+    name) pairs in netlists, sorted.
+    """
+    counts = {}
+    for _, out_name in netlists:
+        counts[out_name] = counts.get(out_name, 0) + 1
+    return sorted(name for name, count in counts.items() if count > 1)
+
+
+def convert_netlist(raw_netlist, graph_format='full'):
+    """
+    Parse a raw netlist and build its graph, timing the parse.
+
+    Returns a tuple: (graph, stats)
+    graph is the dict built by build_graph, or by build_compact_graph if
+        graph_format is 'compact'.
+    stats is a dict of counts and timings for this netlist.
+    """
+    start_time = time.time()
+    modules, elabs, net_manager = parse_netlist(raw_netlist)
+    parse_time = time.time()
+    if graph_format == 'compact':
+        graph = build_compact_graph(modules, elabs, net_manager)
+    else:
+        graph = build_graph(modules, elabs, net_manager)
+    end_time = time.time()
+
+    stats = {
+        'bytes': len(raw_netlist.encode('utf-8')),
+        'modules': len(modules),
+        'nets': len(net_manager.nets),
+        'elabs': len(elabs),
+        'parse_secs': parse_time - start_time,
+        'graph_secs': end_time - parse_time,
+    }
+    return graph, stats
+
+
+def convert_file(job):
+    """
+    Convert one netlist file in a worker process.
+
+    job is a tuple: (path, output name, output directory or None,
+        graph format)
+
+    Returns a stats dict for the file. If conversion failed, it holds an
+    'error' message instead of counts.
+    """
+    file_path, out_name, out_dir, graph_format = job
+    stats = {'path': file_path}
+    try:
+        with open(file_path) as f:
+            raw_netlist = f.read()
+        graph, file_stats = convert_netlist(raw_netlist, graph_format)
+        stats.update(file_stats)
+        if out_dir:
+            out_path = os.path.join(out_dir, out_name + '.json')
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            with open(out_path, 'w') as f:
+                json.dump(graph, f, separators=(',', ':'))
+            stats['output'] = out_path
+            stats['output_bytes'] = os.path.getsize(out_path)
+    except Exception as e:
+        stats['error'] = '%s: %s' % (type(e).__name__, e)
+    return stats
+
+
+def format_stats(stats):
+    if 'error' in stats:
+        return '%s: FAILED %s' % (stats['path'], stats['error'])
+    return ('%(path)s: %(bytes)d bytes, %(modules)d modules, %(nets)d nets, '
+            '%(elabs)d elabs, parsed in %(parse_secs).3fs' % stats)
+
+
+def summarize(all_stats, wall_secs):
+    """
+    Aggregate per-file stats into totals and throughput.
+    """
+    converted = [s for s in all_stats if 'error' not in s]
+    total_bytes = sum(s['bytes'] for s in converted)
+    parse_secs = sum(s['parse_secs'] for s in converted)
+    return {
+        'files': len(all_stats),
+        'failed': len(all_stats) - len(converted),
+        'bytes': total_bytes,
+        'modules': sum(s['modules'] for s in converted),
+        'nets': sum(s['nets'] for s in converted),
+        'elabs': sum(s['elabs'] for s in converted),
+        'parse_secs': parse_secs,
+        'wall_secs': wall_secs,
+        'files_per_sec': len(converted) / wall_secs if wall_secs else 0,
+        'mb_per_sec': total_bytes / 1e6 / wall_secs if wall_secs else 0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m ivernetp',
+        description='Convert Icarus Verilog netlists to graph JSON.')
+    parser.add_argument('sources', nargs='+',
+                        help="netlist files or directories, or '-' to read "
+                             "paths from stdin")
+    parser.add_argument('-o', '--output-dir',
+                        help='write graphs here; without it, only stats are '
+                             'reported')
+    parser.add_argument('-p', '--pattern', default='*netlist*',
+                        help='file name pattern to match in directories '
+                             '(default: %(default)s)')
+    parser.add_argument('-f', '--format', choices=GRAPH_FORMATS,
+                        default='full',
+                        help='graph encoding (default: %(default)s)')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--json', action='store_true',
+                        help='print stats as JSON lines')
+    args = parser.parse_args(argv)
+
+    netlists = list(find_netlists(args.sources, args.pattern))
+    if args.output_dir:
+        duplicates = find_duplicate_names(netlists)
+        if duplicates:
+            parser.error('several sources would be written to %s' %
+                         ', '.join(os.path.join(args.output_dir, name +
+                                                '.json')
+                                   for name in duplicates))
+    jobs = [(file_path, out_name, args.output_dir, args.format)
+            for file_path, out_name in netlists]
+
+    start_time = time.time()
+    all_stats = []
+    with Pool(args.processes) as pool:
+        for stats in pool.imap_unordered(convert_file, jobs):
+            all_stats.append(stats)
+            print(json.dumps(stats) if args.json else format_stats(stats))
+    summary = summarize(all_stats, time.time() - start_time)
+
+    if args.json:
+        print(json.dumps({'summary': summary}))
+    else:
+        print('%(files)d files (%(failed)d failed), %(bytes)d bytes, '
+              '%(modules)d modules, %(nets)d nets, %(elabs)d elabs' % summary)
+        print('%(wall_secs).3fs wall, %(parse_secs).3fs parsing, '
+              '%(files_per_sec).1f files/s, %(mb_per_sec).2f MB/s' % summary)
+
+    return 1 if summary['failed'] else 0
@@ -1,9 +1,13 @@
 from .ivl_structures import IvlModule, IvlPort
 from .ivl_elabs import IvlElabNetPartSelect, IvlElabPosedge, IvlElabLogic
 from .ivl_enums import IvlElabType, IvlPortType, IvlDataDirection
-from .utils import leading_spaces, is_local_finder, group_lines
+from .utils import leading_spaces, is_local_finder, group_lines, gc_paused
 
+from multiprocessing import Pool
+import gc
+import os
 import re
+import threading
 
 # Used to lookup enum types from strings
 ELAB_TYPE_LOOKUP = {
@@ -58,22 +62,63 @@ def parse_module_lines(lines, net_manager):
 
     Returns an IvlModule object.
     """
+    return build_module(module_lines_to_record(lines), net_manager)
+
+
+def module_lines_to_record(lines):
+    """
+    Parse lines that make up a module into a flat record of plain values.
+    Records don't reference each other, so they are cheap to send between
+    processes.
+
+    Returns a tuple: (name, module_type, port_records)
+    port_records is a list as returned by parse_module_data.
+    """
     module_meta = lines[0]
     module_data = lines[1:]
     name, supertype, module_type_raw, inst_type = module_meta.split(' ')
     module_type = module_type_raw.lstrip('<').rstrip('>')
-    ports = parse_module_data(module_data, net_manager)
+    return name, module_type, parse_module_data(module_data)
+
+
+def build_module(record, net_manager):
+    """
+    Build an IvlModule and its IvlPorts from a record made by
+    module_lines_to_record, adding the ports to nets in net_manager.
+
+    Returns an IvlModule object.
+    """
+    name, module_type, port_records = record
+    ports = []
+    for (port_name, xtype, width, direction, is_local, snippet,
+         port_nets) in port_records:
+        port = IvlPort(port_name, xtype, width=width, code_snippet=snippet,
+                       is_local=is_local, direction=direction)
+        for net_id, net_name in port_nets:
+            net_manager.add_port_to_net(net_id, net_name, port)
+        ports.append(port)
+    return make_module(name, module_type, ports)
+
+
+def make_module(name, module_type, ports):
+    """
+    Create an IvlModule owning ports.
+
+    Returns the new IvlModule object.
+    """
     module = IvlModule(name, module_type, ports)
     for port in ports:
         port.parent_module = module
     return module
 
 
-def parse_module_data(lines, net_manager):
+def parse_module_data(lines):
     """
     Parse the module data (not the first line, which is metadata).
 
-    Returns a list of IvlPort objects created from the module.
+    Returns a list of port records, one per port, each a tuple:
+    (name, xtype, width, direction, is_local, code_snippet, nets)
+    nets is a list of (net_id, net_name) tuples the port belongs to.
     """
     ports = []
     port = None
@@ -87,7 +132,7 @@ def parse_module_data(lines, net_manager):
 
             # reg or wire lines
             if line.startswith('reg') or line.startswith('wire'):
-                is_local = is_local_finder.search(line)
+                is_local = bool(is_local_finder.search(line))
 
                 # Line starts with either 'reg' or 'wire'
                 if line.startswith('reg'):
@@ -116,8 +161,7 @@ def parse_module_data(lines, net_manager):
                             .split('vector_width=')[1]
                             .split(' pin_count=')[0])
 
-                port = IvlPort(name, xtype, width=width, direction=direction,
-                               is_local=is_local)
+                port = (name, xtype, width, direction, is_local, None, [])
 
             # event lines
             elif line.startswith('event'):
@@ -129,13 +173,13 @@ def parse_module_data(lines, net_manager):
                 # event _s0; ... // <snippet>
                 snippet = line.split('// ')[1]
 
-                port = IvlPort(name, xtype, code_snippet=snippet)
+                port = (name, xtype, None, None, False, snippet, [])
 
         # Port data lines have eight leading spaces
         elif leading_spaces(line) == 8:
             if port:
                 net_id, net_name = line.split(': ')[1].split(' ')
-                net_manager.add_port_to_net(net_id, net_name, port)
+                port[-1].append((net_id, net_name))
 
     if port:
         ports.append(port)
@@ -149,12 +193,26 @@ def parse_elab_bundle_lines(lines, net_manager):
 
     Returns the new IvlElab object.
     """
+    return build_elab(elab_lines_to_record(lines), net_manager)
+
+
+def elab_lines_to_record(lines):
+    """
+    Parse lines from an elab into a flat record of plain values.
+
+    Returns a tuple: (xtype, info, nets)
+    info is (large_net, offset, width) for NetPartSelects, the logic type for
+        logics, and None for posedges.
+    nets is a list of (data_dir, net_id, net_name) tuples, where data_dir is
+        'I' or 'O'.
+    """
     # posedge -> ...
     # NetPartSelect(PV): ...
     # logic: ...
     xtype_raw = lines[0].split(' -> ')[0].split('(')[0].split(':')[0]
     xtype = ELAB_TYPE_LOOKUP[xtype_raw]
     info_split = lines[0].split(' ')
+    info = None
 
     if xtype is IvlElabType.net_part_select:
         # NetPartSelect(<io_size_flag>): <name> #(.,.,.) \
@@ -171,29 +229,53 @@ def parse_elab_bundle_lines(lines, net_manager):
             large_net = IvlDataDirection.input
         else:
             raise ValueError('Invalid IO size flag: %s' % io_size_flag)
+        info = (large_net, offset, width)
 
     elif xtype is IvlElabType.logic:
         # logic: <logic_type> ...
-        logic_type = info_split[1]
+        info = info_split[1]
 
-    input_nets = []
-    output_nets = []
+    nets = []
     for line in lines[1:]:
         # Net lines have four leading spaces. Example line:
         # 0 pin0 I (strong0 strong1): 0x7fbd08d0a630 bargraph_testbench.b._s0
         line_split = line.split(' ')
         data_dir = line_split[6]
-        net_id = line_split[9]
-        net_name = line_split[10]
+        if data_dir not in ('I', 'O'):
+            raise ValueError('Invalid net data direction: %s' % data_dir)
+        nets.append((data_dir, line_split[9], line_split[10]))
+
+    return xtype, info, nets
+
+
+def build_elab(record, net_manager):
+    """
+    Build an IvlElab from a record made by elab_lines_to_record, looking up
+    or creating its nets in net_manager.
+
+    Returns the new IvlElab object.
+    """
+    xtype, info, nets = record
+    input_nets = []
+    output_nets = []
+    for data_dir, net_id, net_name in nets:
         net = net_manager.get_or_make_net(net_id, net_name)
         if data_dir == 'I':
             input_nets.append(net)
-        elif data_dir == 'O':
-            output_nets.append(net)
         else:
-            raise ValueError('Invalid net data direction: %s' % data_dir)
+            output_nets.append(net)
+    return make_elab(xtype, info, input_nets, output_nets)
 
+
+def make_elab(xtype, info, input_nets, output_nets):
+    """
+    Create the IvlElab subclass for xtype. info is as in the records made by
+    elab_lines_to_record.
+
+    Returns the new IvlElab object.
+    """
     if xtype is IvlElabType.net_part_select:
+        large_net, offset, width = info
         elab = IvlElabNetPartSelect(input_nets[0], output_nets[0], large_net,
                                     offset, width)
 
@@ -201,7 +283,7 @@ def parse_elab_bundle_lines(lines, net_manager):
         elab = IvlElabPosedge(input_nets[0])
 
     elif xtype is IvlElabType.logic:
-        elab = IvlElabLogic(logic_type, input_nets, output_nets[0])
+        elab = IvlElabLogic(info, input_nets, output_nets[0])
 
     else:
         raise ValueError('Invalid elab xtype: %s' % xtype)
@@ -209,20 +291,332 @@ def parse_elab_bundle_lines(lines, net_manager):
     return elab
 
 
-def parse_modules_and_elabs(raw_netlist, net_manager):
+def parse_modules_and_elabs(raw_netlist, net_manager,
+                            parallel_threshold=None, processes=None):
     """
     Parses a raw netlist into its IvlModule and IvlElab objects.
 
+    Parsing is single-threaded unless parallel_threshold is set and the
+    netlist is longer than parallel_threshold characters. In that case it
+    is parsed by parse_parallel in a pool of processes (os.cpu_count() if
+    processes is None).
+
+    The cyclic garbage collector is paused while objects are built. None of
+    them are garbage yet, and collections triggered by creating millions of
+    them would otherwise take up a large part of the parse.
+
     Returns a tuple: (modules, elabs)
     modules is a list of IvlModule objects.
     elabs is a list of IvlElab objects.
     """
-    sections = parse_netlist_to_sections(raw_netlist)
-    modules_lines = group_lines(sections['SCOPES'])
-    elab_bundles_lines = group_lines(sections['ELABORATED NODES'])
+    if (parallel_threshold is not None and
+            len(raw_netlist) > parallel_threshold):
+        return parse_parallel(raw_netlist, net_manager, processes)
+
+    with gc_paused():
+        sections = parse_netlist_to_sections(raw_netlist)
+        modules_lines = group_lines(sections['SCOPES'])
+        elab_bundles_lines = group_lines(sections['ELABORATED NODES'])
+        modules = [parse_module_lines(lines, net_manager)
+                   for lines in modules_lines]
+        elabs = [parse_elab_bundle_lines(lines, net_manager)
+                 for lines in elab_bundles_lines]
+        return modules, elabs
+
+
+# Chunks per pool process. More chunks than processes lets the parent build
+# objects from finished chunks while later ones are still being parsed.
+CHUNKS_PER_PROCESS = 4
+
+# Match a section title line, as parse_netlist_to_sections does, on the
+# first line or after a newline. Searching for the newline first is much
+# faster than a multiline '^'.
+first_title_finder = re.compile('([A-Z][A-Z ]*):.*')
+title_finder = re.compile('\n([A-Z][A-Z ]*):[^\n]*')
+# Matches the newline before a line with no leading spaces, which starts a
+# group in group_lines
+group_start_finder = re.compile('\n(?! )')
+
+# Enum members by value, for decoding chunks
+PORT_TYPES = {t.value: t for t in IvlPortType}
+DATA_DIRECTIONS = {d.value: d for d in IvlDataDirection}
+DATA_DIRECTIONS[0] = None
+ELAB_TYPES = {t.value: t for t in IvlElabType}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(processes):
+    """
+    Returns this process's parsing pool with the given number of processes,
+    starting it on first use. Pools live as long as the process, so
+    concurrent parses share their workers instead of each forking a pool.
+    """
+    with _pools_lock:
+        pool = _pools.get(processes)
+        if pool is None:
+            pool = _pools[processes] = Pool(processes)
+        return pool
+
 
-    modules = [parse_module_lines(lines, net_manager)
-               for lines in modules_lines]
-    elabs = [parse_elab_bundle_lines(lines, net_manager)
-             for lines in elab_bundles_lines]
+def parse_parallel(raw_netlist, net_manager, processes=None):
+    """
+    Parses a raw netlist in a process pool.
+
+    The SCOPES and ELABORATED NODES sections are cut into chunks of text at
+    group_lines boundaries, without splitting the rest of the netlist into
+    lines. Workers parse each chunk and return it encoded as flat lists, as
+    described in encode_module_chunk and encode_elab_chunk, with a table of
+    the chunk's nets. Here the chunk net tables are merged by net id and the
+    objects are built, in the original order, so the result matches a
+    single-threaded parse.
+
+    Returns a tuple: (modules, elabs)
+    """
+    processes = processes or os.cpu_count() or 1
+    spans = section_spans(raw_netlist)
+    chunk_count = processes * CHUNKS_PER_PROCESS
+    tasks = ([(encode_module_chunk, text) for text in
+              split_section(raw_netlist, spans['SCOPES'], chunk_count)] +
+             [(encode_elab_chunk, text) for text in
+              split_section(raw_netlist, spans['ELABORATED NODES'],
+                            chunk_count)])
+
+    pool = get_pool(processes)
+    modules = []
+    elabs = []
+    with gc_paused():
+        results = pool.imap(parse_chunk, tasks)
+        for (encoder, _), chunk in zip(tasks, results):
+            if encoder is encode_module_chunk:
+                modules.extend(build_module_chunk(chunk, net_manager))
+            else:
+                elabs.extend(build_elab_chunk(chunk, net_manager))
     return modules, elabs
+
+
+def section_spans(raw_netlist):
+    """
+    Find where each section's lines are in a raw netlist, without splitting
+    it into lines.
+
+    Returns a dict.
+    Keys are the name of the section.
+    Values are (start, end) offsets of the section's lines, not including
+    the title line or the newline before the next title.
+    """
+    spans = {}
+    title = None
+    start = None
+    match = first_title_finder.match(raw_netlist)
+    if match:
+        title = match.group(1)
+        start = match.end() + 1
+    for match in title_finder.finditer(raw_netlist):
+        if title:
+            spans[title] = (start, match.start())
+        title = match.group(1)
+        start = match.end() + 1
+    if title:
+        spans[title] = (start, len(raw_netlist))
+    return spans
+
+
+def split_section(raw_netlist, span, chunk_count):
+    """
+    Cut the lines of a section into at most chunk_count pieces of text of
+    roughly equal length. Cuts are only made before lines that start a
+    group, so each piece holds whole groups.
+
+    Returns a list of strings.
+    """
+    start, end = span
+    if end <= start:
+        return []
+    step = (end - start) / chunk_count
+    starts = [start]
+    for k in range(1, chunk_count):
+        position = max(start + int(k * step), starts[-1])
+        match = group_start_finder.search(raw_netlist, position, end)
+        if match is None or match.end() >= end:
+            break
+        starts.append(match.end())
+    ends = [s - 1 for s in starts[1:]] + [end]
+    return [raw_netlist[s:e] for s, e in zip(starts, ends)]
+
+
+def parse_chunk(task):
+    """
+    Parses one chunk of section text in a worker process.
+
+    task is a tuple: (encoder, text)
+    encoder is encode_module_chunk or encode_elab_chunk.
+    text is whole groups of lines from one section.
+
+    Returns what encoder returns.
+    """
+    encoder, text = task
+    # Pool workers are single-threaded, so the collector can be switched
+    # directly rather than through gc_paused
+    gc.disable()
+    try:
+        return encoder(group_lines(text.split('\n')))
+    finally:
+        gc.enable()
+
+
+class NetTable:
+    """
+    Numbers the nets seen in one chunk in the order first seen, so records
+    can refer to them by index.
+    """
+    def __init__(self):
+        self.ids = []
+        self.names = []
+        self.indices = {}
+
+    def index(self, net_id, net_name):
+        index = self.indices.get(net_id)
+        if index is None:
+            index = self.indices[net_id] = len(self.ids)
+            self.ids.append(net_id)
+            self.names.append(net_name)
+        return index
+
+    def merge(self, net_manager):
+        """
+        Look up or create each net in net_manager by id.
+
+        Returns a list of IvlNets in table order.
+        """
+        return [net_manager.get_or_make_net(net_id, net_name)
+                for net_id, net_name in zip(self.ids, self.names)]
+
+
+def encode_module_chunk(modules_lines):
+    """
+    Parse module line groups into flat lists, which pickle far more cheaply
+    than a list of records.
+
+    Returns a tuple: (modules, ports, port_nets, nets)
+    modules is a tuple of lists: names, types and port counts.
+    ports is a tuple of lists: names, type values, widths, direction values
+        (0 for None), is_local flags, code snippets and net counts.
+    port_nets is a list of indices into nets, net counts long per port.
+    nets is a NetTable.
+    """
+    nets = NetTable()
+    modules = ([], [], [])
+    ports = ([], [], [], [], [], [], [])
+    port_nets = []
+    for lines in modules_lines:
+        name, module_type, port_records = module_lines_to_record(lines)
+        modules[0].append(name)
+        modules[1].append(module_type)
+        modules[2].append(len(port_records))
+        for (port_name, xtype, width, direction, is_local, snippet,
+             net_records) in port_records:
+            ports[0].append(port_name)
+            ports[1].append(xtype.value)
+            ports[2].append(width)
+            ports[3].append(direction.value if direction else 0)
+            ports[4].append(is_local)
+            ports[5].append(snippet)
+            ports[6].append(len(net_records))
+            for net_id, net_name in net_records:
+                port_nets.append(nets.index(net_id, net_name))
+    return modules, ports, port_nets, nets
+
+
+def build_module_chunk(chunk, net_manager):
+    """
+    Build the IvlModules in a chunk made by encode_module_chunk, adding
+    their ports to nets in net_manager.
+
+    Returns a list of IvlModule objects.
+    """
+    (names, types, port_counts), ports, port_nets, net_table = chunk
+    nets = net_table.merge(net_manager)
+
+    built_ports = []
+    position = 0
+    for (port_name, xtype, width, direction, is_local, snippet,
+         net_count) in zip(*ports):
+        port = IvlPort(port_name, PORT_TYPES[xtype], width=width,
+                       code_snippet=snippet, is_local=is_local,
+                       direction=DATA_DIRECTIONS[direction])
+        for index in port_nets[position:position + net_count]:
+            net = nets[index]
+            net.add_member(port)
+            port.set_net(net)
+        position += net_count
+        built_ports.append(port)
+
+    modules = []
+    position = 0
+    for name, module_type, port_count in zip(names, types, port_counts):
+        modules.append(make_module(
+            name, module_type,
+            built_ports[position:position + port_count]))
+        position += port_count
+    return modules
+
+
+def encode_elab_chunk(elab_bundles_lines):
+    """
+    Parse elab line groups into flat lists, like encode_module_chunk.
+
+    Returns a tuple: (elabs, elab_nets, nets)
+    elabs is a tuple of lists: type values, infos and net counts. infos are
+        as in elab_lines_to_record, with the NetPartSelect large_net as a
+        direction value.
+    elab_nets is a tuple: (indices into nets, a string of 'I' and 'O' data
+        directions), net counts long per elab.
+    nets is a NetTable.
+    """
+    nets = NetTable()
+    elabs = ([], [], [])
+    net_indices = []
+    data_dirs = []
+    for lines in elab_bundles_lines:
+        xtype, info, net_records = elab_lines_to_record(lines)
+        if xtype is IvlElabType.net_part_select:
+            large_net, offset, width = info
+            info = (large_net.value, offset, width)
+        elabs[0].append(xtype.value)
+        elabs[1].append(info)
+        elabs[2].append(len(net_records))
+        for data_dir, net_id, net_name in net_records:
+            net_indices.append(nets.index(net_id, net_name))
+            data_dirs.append(data_dir)
+    return elabs, (net_indices, ''.join(data_dirs)), nets
+
+
+def build_elab_chunk(chunk, net_manager):
+    """
+    Build the IvlElabs in a chunk made by encode_elab_chunk, looking up or
+    creating their nets in net_manager.
+
+    Returns a list of IvlElab objects.
+    """
+    (types, infos, net_counts), (net_indices, data_dirs), net_table = chunk
+    nets = net_table.merge(net_manager)
+
+    elabs = []
+    position = 0
+    for xtype, info, net_count in zip(types, infos, net_counts):
+        xtype = ELAB_TYPES[xtype]
+        if xtype is IvlElabType.net_part_select:
+            large_net, offset, width = info
+            info = (DATA_DIRECTIONS[large_net], offset, width)
+        input_nets = []
+        output_nets = []
+        for k in range(position, position + net_count):
+            if data_dirs[k] == 'I':
+                input_nets.append(nets[net_indices[k]])
+            else:
+                output_nets.append(nets[net_indices[k]])
+        position += net_count
+        elabs.append(make_elab(xtype, info, input_nets, output_nets))
+    return elabs
@@ -5,10 +5,44 @@ from .utils import IvlNetManager
 import json
 
 
-def netlist_to_json(raw_netlist):
+def parse_netlist(raw_netlist, parallel_threshold=None, processes=None):
+    """
+    Parse a raw netlist with a fresh IvlNetManager.
+
+    Returns a tuple: (modules, elabs, net_manager)
+    """
     net_manager = IvlNetManager()
-    modules, elabs = parse_modules_and_elabs(raw_netlist, net_manager)
+    modules, elabs = parse_modules_and_elabs(
+        raw_netlist, net_manager, parallel_threshold=parallel_threshold,
+        processes=processes)
+    return modules, elabs, net_manager
+
+
+GRAPH_FORMATS = ('full', 'compact')
+
+
+def netlist_to_json(raw_netlist, parallel_threshold=None, processes=None,
+                    graph_format='full'):
+    """
+    Parse a raw netlist into the JSON graph sent to clients.
+
+    graph_format is 'full' for build_graph output or 'compact' for
+    build_compact_graph output.
+    """
+    parsed = parse_netlist(raw_netlist, parallel_threshold, processes)
+    if graph_format == 'full':
+        return json.dumps(build_graph(*parsed))
+    elif graph_format == 'compact':
+        return json.dumps(build_compact_graph(*parsed), separators=(',', ':'))
+    raise ValueError('Invalid graph format: %s' % graph_format)
+
 
+def port_connections(modules, elabs, net_manager):
+    """
+    Find the port-to-port connections between modules.
+
+    Returns a list of (output_port, input_port, width) tuples.
+    """
     local_nets = set()
     for module in modules:
         for port in module.ports:
@@ -37,41 +71,11 @@ def netlist_to_json(raw_netlist):
                 new_in = match.net_in
                 e.nets_in[pos] = new_in
 
-    nodes = []
-    edges = []
-
-    for module in modules:
-        full_name = module.name
-        short_name = None
-        parent = None
-        try:
-            parent, short_name = module.name.rsplit('.', 1)
-        except ValueError:
-            short_name = full_name
-        nodes.append({'id': full_name, 'label': '%s\\n<%s>' %
-                     (short_name, module.xtype)})
-        if parent:
-            edges.append({'from': parent, 'to': full_name})
-
-    output = {'nodes': nodes, 'edges': edges}
-
-    nodes = []
-    edges = []
+    connections = []
 
     all_nets = net_manager.nets.values()
     nets = [n for n in all_nets if len(n.members) > 1]
 
-    for module in modules:
-        full_name = module.name
-        short_name = None
-        parent = None
-        try:
-            parent, short_name = module.name.rsplit('.', 1)
-        except ValueError:
-            short_name = full_name
-        nodes.append({'id': full_name, 'label': '%s\\n<%s>' %
-                     (short_name, module.xtype)})
-
     for net in nets:
         inputs = []
         outputs = []
@@ -91,18 +95,94 @@ def netlist_to_json(raw_netlist):
 
         for i in inputs:
             for o in outputs:
-                label = '%s → %s' % (o.name, i.name)
                 if i.width > o.width:
                     width = i.width
                 else:
                     width = o.width
-                i_id = i.parent_module.name
-                o_id = o.parent_module.name
-                edges.append({'from': o_id, 'to': i_id, 'width': width,
-                              'label': label})
+                connections.append((o, i, width))
+
+    return connections
+
+
+def build_graph(modules, elabs, net_manager):
+    """
+    Build the module graph sent to clients from parsed modules, elabs and
+    nets.
+
+    Returns a dict with 'nodes' and 'edges' lists.
+    """
+    nodes = []
+    edges = []
+
+    for module in modules:
+        full_name = module.name
+        try:
+            parent, short_name = module.name.rsplit('.', 1)
+        except ValueError:
+            short_name = full_name
+        nodes.append({'id': full_name, 'label': '%s\\n<%s>' %
+                     (short_name, module.xtype)})
+
+    for o, i, width in port_connections(modules, elabs, net_manager):
+        label = '%s → %s' % (o.name, i.name)
+        i_id = i.parent_module.name
+        o_id = o.parent_module.name
+        edges.append({'from': o_id, 'to': i_id, 'width': width,
+                      'label': label})
 
     output = {'nodes': nodes, 'edges': edges}
-    return json.dumps(output)
+    return output
+
+
+class StringTable:
+    """
+    Assigns each distinct string an index in the order first seen.
+    """
+    def __init__(self):
+        self.strings = []
+        self.indices = {}
+
+    def index(self, string):
+        if string not in self.indices:
+            self.indices[string] = len(self.strings)
+            self.strings.append(string)
+        return self.indices[string]
+
+
+def build_compact_graph(modules, elabs, net_manager):
+    """
+    Build the same graph as build_graph, encoded so its size grows with the
+    number of distinct names rather than the number of edges.
+
+    Returns a dict:
+        strings: every distinct module name, module type and port name.
+        nodes: columns 'name' and 'type', both string indices. The node
+            label in the full format is the last dotted part of the name,
+            then the type in angle brackets.
+        edges: columns 'from' and 'to' (node indices), 'width', and
+            'from_port' and 'to_port' (string indices). The edge label in
+            the full format is '<from_port> → <to_port>'.
+    """
+    strings = StringTable()
+    node_indices = {}
+    nodes = {'name': [], 'type': []}
+    edges = {'from': [], 'to': [], 'width': [], 'from_port': [],
+             'to_port': []}
+
+    for module in modules:
+        node_indices[module.name] = len(nodes['name'])
+        nodes['name'].append(strings.index(module.name))
+        nodes['type'].append(strings.index(module.xtype))
+
+    for o, i, width in port_connections(modules, elabs, net_manager):
+        edges['from'].append(node_indices[o.parent_module.name])
+        edges['to'].append(node_indices[i.parent_module.name])
+        edges['width'].append(width)
+        edges['from_port'].append(strings.index(o.name))
+        edges['to_port'].append(strings.index(i.name))
+
+    return {'format': 'compact', 'strings': strings.strings, 'nodes': nodes,
+            'edges': edges}
 
 
 if __name__ == '__main__':
@@ -1,10 +1,18 @@
 from .ivl_enums import IvlElabType, IvlPortType, IvlDataDirection
-from .parsers import parse_modules_and_elabs
-from .utils import IvlNetManager
+from .benchmark import chain_netlist
+from .cli import convert_netlist, find_netlists, main
+from .parsers import (parse_modules_and_elabs, parse_netlist_to_sections,
+                      section_spans, split_section)
+from .process_netlist import build_graph, build_compact_graph
+from .utils import IvlNetManager, group_lines
 
+from os import path
+import io
 import pytest
 import sure  # noqa
 
+TEST_NETLIST = path.join(path.dirname(__file__), 'test.netlist')
+
 
 @pytest.yield_fixture
 def read_netlist():
@@ -13,7 +21,7 @@ def read_netlist():
     Create a new net manager as well.
     Return all three as a tuple.
     """
-    with open('test.netlist') as f:
+    with open(TEST_NETLIST) as f:
         test_netlist = f.read()
     net_manager = IvlNetManager()
     modules, elabs = parse_modules_and_elabs(test_netlist, net_manager)
@@ -76,3 +84,113 @@ def test_nets(read_netlist):
     modules, elabs, net_manager = read_netlist
     to_bg = net_manager.get_net('0x7fbd08d0a950')
     len(to_bg.members).should.be.equal(3)
+
+
+def test_parallel_parse(read_netlist):
+    """Make sure parallel parsing matches single-threaded parsing."""
+    modules, elabs, net_manager = read_netlist
+    with open(TEST_NETLIST) as f:
+        test_netlist = f.read()
+    p_net_manager = IvlNetManager()
+    p_modules, p_elabs = parse_modules_and_elabs(
+        test_netlist, p_net_manager, parallel_threshold=0, processes=4)
+
+    [m.name for m in p_modules].should.be.equal([m.name for m in modules])
+    [repr(e) for e in p_elabs].should.be.equal([repr(e) for e in elabs])
+    list(p_net_manager.nets).should.be.equal(list(net_manager.nets))
+
+    to_bg = p_net_manager.get_net('0x7fbd08d0a950')
+    len(to_bg.members).should.be.equal(3)
+    for member in to_bg.members:
+        member.net.should.be(to_bg)
+    for elab in p_elabs:
+        if elab.xtype is IvlElabType.posedge:
+            elab.net_in.should.be(p_net_manager.get_net(elab.net_in.xid))
+
+
+def test_parallel_parse_long_chain():
+    """Make sure parallel parsing handles long chains of connected modules."""
+    netlist = chain_netlist(3000)
+    net_manager = IvlNetManager()
+    modules, elabs = parse_modules_and_elabs(netlist, net_manager)
+    p_net_manager = IvlNetManager()
+    p_modules, p_elabs = parse_modules_and_elabs(
+        netlist, p_net_manager, parallel_threshold=0, processes=4)
+
+    len(p_modules).should.be.equal(3001)
+    [m.name for m in p_modules].should.be.equal([m.name for m in modules])
+    [repr(e) for e in p_elabs].should.be.equal([repr(e) for e in elabs])
+    list(p_net_manager.nets).should.be.equal(list(net_manager.nets))
+    len(p_net_manager.get_net('0x5').members).should.be.equal(2)
+    p_elabs[4].net_out.should.be(p_net_manager.get_net('0x5'))
+
+
+def test_split_sections():
+    """Make sure chunks hold whole groups and cover each section."""
+    with open(TEST_NETLIST) as f:
+        test_netlist = f.read()
+    sections = parse_netlist_to_sections(test_netlist)
+    spans = section_spans(test_netlist)
+    for title in ('SCOPES', 'ELABORATED NODES'):
+        start, end = spans[title]
+        test_netlist[start:end].split('\n').should.be.equal(sections[title])
+        chunks = split_section(test_netlist, spans[title], 5)
+        len(chunks).should.be.equal(5)
+        groups = [g for c in chunks for g in group_lines(c.split('\n'))]
+        groups.should.be.equal(group_lines(sections[title]))
+
+
+def test_convert_stats():
+    """Make sure the batch converter reports the right counts."""
+    with open(TEST_NETLIST) as f:
+        test_netlist = f.read()
+    graph, stats = convert_netlist(test_netlist)
+    stats['modules'].should.be.equal(6)
+    stats['elabs'].should.be.equal(27)
+    stats['nets'].should.be.equal(27)
+    len(graph['nodes']).should.be.equal(6)
+
+
+def test_compact_graph(read_netlist):
+    """Make sure the compact graph decodes to the full graph."""
+    modules, elabs, net_manager = read_netlist
+    graph = build_graph(modules, elabs, net_manager)
+    compact = build_compact_graph(modules, elabs, net_manager)
+    strings = compact['strings']
+    len(strings).should.be.equal(len(set(strings)))
+
+    names = [strings[i] for i in compact['nodes']['name']]
+    names.should.be.equal([n['id'] for n in graph['nodes']])
+
+    columns = compact['edges']
+    edges = []
+    for pos in range(len(columns['from'])):
+        label = '%s → %s' % (strings[columns['from_port'][pos]],
+                             strings[columns['to_port'][pos]])
+        edges.append((names[columns['from'][pos]], names[columns['to'][pos]],
+                      columns['width'][pos], label))
+    sorted(edges).should.be.equal(sorted(
+        (e['from'], e['to'], e['width'], e['label'])
+        for e in graph['edges']))
+
+
+def test_output_names_are_unique(tmpdir, monkeypatch):
+    """Make sure same-named netlists in different places don't collide."""
+    for name in ('a', 'b'):
+        tmpdir.mkdir(name).join('netlist').write('')
+    source = str(tmpdir)
+    monkeypatch.setattr('sys.stdin', io.StringIO(
+        path.join(source, 'a', 'netlist') + '\n' +
+        path.join(source, 'b', 'netlist') + '\n'))
+    names = [name for _, name in find_netlists([source, '-'], 'netlist')]
+    len(names).should.be.equal(4)
+    names[0].should.be.equal(path.join(source, 'a', 'netlist').lstrip('/'))
+    names[1].should.be.equal(path.join(source, 'b', 'netlist').lstrip('/'))
+
+
+def test_duplicate_output_names_fail(tmpdir):
+    """Make sure nothing is converted if two outputs would share a file."""
+    out_dir = tmpdir.join('out')
+    main.when.called_with([TEST_NETLIST, TEST_NETLIST, '-o', str(out_dir)]
+                          ).should.throw(SystemExit)
+    out_dir.check().should.be.false
@@ -1,6 +1,9 @@
 from .ivl_structures import IvlNet
 
+from contextlib import contextmanager
+import gc
 import re
+import threading
 
 
 class IvlNetManager:
@@ -45,5 +48,33 @@ def group_lines(lines):
     return groups
 
 
+_gc_pause_lock = threading.Lock()
+_gc_pause_count = 0
+_gc_was_enabled = False
+
+
+@contextmanager
+def gc_paused():
+    """
+    Turn off the cyclic garbage collector inside a with block. The
+    collector is shared by all threads, so it is only turned back on when
+    the last thread pausing it leaves its block, and only if it was on to
+    begin with.
+    """
+    global _gc_pause_count, _gc_was_enabled
+    with _gc_pause_lock:
+        if _gc_pause_count == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pause_count += 1
+    try:
+        yield
+    finally:
+        with _gc_pause_lock:
+            _gc_pause_count -= 1
+            if _gc_pause_count == 0 and _gc_was_enabled:
+                gc.enable()
+
+
 is_local_regex = '\(local\)'
 is_local_finder = re.compile(is_local_regex)
@@ -0,0 +1,164 @@
+import config
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS results (
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created REAL NOT NULL,
+        accessed REAL NOT NULL,
+        PRIMARY KEY (kind, key)
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS results_created ON results (created)',
+    'CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(*parts):
+    """
+    Hash a sequence of strings into a hex key. Each part is length-prefixed
+    so ('ab', 'c') and ('a', 'bc') hash differently.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode('utf-8')
+        digest.update(str(len(data)).encode('ascii') + b':')
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class ResultStore:
+    """
+    A result cache in a SQLite file, shared by every server process on a node.
+
+    Values are anything json.dumps can encode, stored under a (kind, key)
+    pair. Entries older than ttl_secs are treated as missing. When the stored
+    values grow past max_bytes, the least recently read entries are evicted.
+
+    Reads only write back their access time if it is more than
+    access_resolution_secs old, so cache hits rarely take SQLite's write
+    lock. Eviction runs at most once every evict_interval_secs per process,
+    so the store can briefly overshoot max_bytes.
+
+    The cache fails open: if SQLite raises, for example because the
+    database stayed locked for longer than timeout_secs, get() reports a
+    miss and put() drops the value.
+
+    SQLite handles locking between processes; each thread gets its own
+    connection.
+    """
+    def __init__(self, db_path, ttl_secs, max_bytes, timeout_secs=1,
+                 access_resolution_secs=60, evict_interval_secs=10):
+        self.db_path = db_path
+        self.ttl_secs = ttl_secs
+        self.max_bytes = max_bytes
+        self.timeout_secs = timeout_secs
+        self.access_resolution_secs = access_resolution_secs
+        self.evict_interval_secs = evict_interval_secs
+        self.last_evict = None
+        self._local = threading.local()
+        with self._connection() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout_secs)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, kind, key):
+        """
+        Returns the stored value, or None if it is missing, expired, or the
+        store couldn't be read.
+        """
+        now = time.time()
+        try:
+            conn = self._connection()
+            with conn:
+                row = conn.execute('SELECT value, created, accessed '
+                                   'FROM results WHERE kind = ? AND key = ?',
+                                   (kind, key)).fetchone()
+                if row is None:
+                    return None
+                value, created, accessed = row
+                # Expired rows are left for _evict to delete
+                if now - created > self.ttl_secs:
+                    return None
+                if now - accessed > self.access_resolution_secs:
+                    conn.execute('UPDATE results SET accessed = ? '
+                                 'WHERE kind = ? AND key = ?',
+                                 (now, kind, key))
+        except sqlite3.Error as e:
+            logger.warning('Result store read failed: %s', e)
+            return None
+        return json.loads(value)
+
+    def put(self, kind, key, value):
+        """
+        Store a value, replacing any previous value under the same key. Every
+        evict_interval_secs, also evict expired and least recently read
+        entries.
+        """
+        now = time.time()
+        encoded = json.dumps(value)
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO results '
+                             '(kind, key, value, size, created, accessed) '
+                             'VALUES (?, ?, ?, ?, ?, ?)',
+                             (kind, key, encoded, size, now, now))
+                if (self.last_evict is None or
+                        now - self.last_evict >= self.evict_interval_secs):
+                    self._evict(conn, now)
+                    self.last_evict = now
+        except sqlite3.Error as e:
+            logger.warning('Result store write failed: %s', e)
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM results WHERE created < ?',
+                     (now - self.ttl_secs,))
+        total, = conn.execute('SELECT COALESCE(SUM(size), 0) '
+                              'FROM results').fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute('SELECT kind, key, size FROM results '
+                            'ORDER BY accessed')
+        doomed = []
+        for kind, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((kind, key))
+            total -= size
+        conn.executemany('DELETE FROM results WHERE kind = ? AND key = ?',
+                         doomed)
+
+
+def make_result_store():
+    """
+    Build the store configured in config.ResultStore, or None if it is
+    disabled.
+    """
+    if config.ResultStore.PATH is None:
+        return None
+    return ResultStore(config.ResultStore.PATH, config.ResultStore.TTL,
+                       config.ResultStore.MAX_BYTES)
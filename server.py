@@ -1,53 +1,51 @@
 import config
 
 import ivernetp
+from ivernetp.process_netlist import GRAPH_FORMATS
+from executors import (make_executor, parse_outputs, CompileError,
+                       CompileTimeoutError, CompileWorkerError, OUTPUTS)
+from result_store import make_result_store, content_hash
+from single_flight import SingleFlight
 
 from flask import Flask, jsonify, request
 
 import sys
-import tempfile
-import shutil
-import subprocess
 import time
-from os import path
-from multiprocessing import Process, Queue
 
 
 app = Flask(__name__)
 app.config.from_object(config.Flask)
 
 
-class CompileTimeoutError(Exception):
-    pass
+executor = make_executor()
+result_store = make_result_store()
+in_flight = SingleFlight()
 
 
-def compile_task(paths, result_queue):
-    cmd = ['iverilog', '-N', paths['netlist'], '-o', paths['compiled'],
-           paths['module'], paths['testbench']]
-    try:
-        subprocess.check_call(cmd, cwd=paths['temp_dir'])
-        stdout = (subprocess.check_output(['vvp', paths['compiled']],
-                                          cwd=paths['temp_dir'])
-                  .decode('utf-8'))
-    except subprocess.CalledProcessError as e:
-        result_queue.put((str(e), None))
-    else:
-        result_queue.put((None, stdout))
-
-
-def compile_with_timeout(paths, timeout_secs):
-    result_queue = Queue()
-    args = (paths, result_queue)
-    compile_process = Process(target=compile_task, args=args)
-    compile_process.start()
-    compile_process.join(timeout_secs)
+def run_compile(key, module, testbench, timeout_secs, graph_format, outputs):
+    start_time = time.time()
+    result = executor.compile(module, testbench, timeout_secs, outputs)
+    end_time = time.time()
 
-    if compile_process.is_alive():
-        compile_process.terminate()
-        raise CompileTimeoutError
+    output = {}
+    if 'stdout' in outputs:
+        output['stdout'] = result['stdout']
+    if 'waveform' in outputs:
+        output['waveform'] = result['waveform']
+    if 'waveform_summary' in outputs:
+        output['waveform_summary'] = result['waveform_summary']
+    if 'netlist' in outputs:
+        output['netlist'] = ivernetp.process_netlist.netlist_to_json(
+            result['netlist'],
+            parallel_threshold=config.Netlist.PARALLEL_PARSE_THRESHOLD,
+            processes=config.Netlist.PARALLEL_PARSE_PROCESSES,
+            graph_format=graph_format)
+    if 'timing' in outputs:
+        output['seconds'] = end_time - start_time
 
-    error, stdout = result_queue.get()
-    return stdout
+    if result_store:
+        result_store.put('compile', key, output)
+    return output
 
 
 @app.after_request
@@ -71,49 +69,38 @@ def compile():
         if arg not in request.json:
             return 'Argument %s not found in posted JSON' % arg, 400
 
-    temp_dir = tempfile.mkdtemp(prefix=config.Misc.TEMP_DIR_PREFIX)
+    graph_format = request.json.get('graph_format', 'full')
+    if graph_format not in GRAPH_FORMATS:
+        return 'Invalid graph_format: %s' % graph_format, 400
+
+    outputs = parse_outputs(request.json)
+    if outputs is None:
+        return ('Argument outputs must be a list of %s' %
+                ', '.join(OUTPUTS)), 400
+
+    key = content_hash(request.json['module'], request.json['testbench'],
+                       graph_format, ','.join(outputs))
+    if result_store:
+        cached = result_store.get('compile', key)
+        if cached is not None:
+            return jsonify(**cached)
 
+    timeout_secs = config.Compiler.COMPILE_TIMEOUT
     try:
-        paths = {
-            'temp_dir': temp_dir,
-            'module': path.join(temp_dir, 'module.v'),
-            'testbench': path.join(temp_dir, 'testbench.v'),
-            'netlist': path.join(temp_dir, 'netlist'),
-            'compiled': path.join(temp_dir, 'compiled.vvp'),
-            'waveform': path.join(temp_dir, 'waveform.vcd')
-        }
-
-        with open(paths['module'], 'w') as f:
-            f.write(request.json['module'])
-        with open(paths['testbench'], 'w') as f:
-            f.write(request.json['testbench'])
-
-        start_time = time.time()
-        timeout_secs = config.Compiler.COMPILE_TIMEOUT
-        try:
-            stdout = compile_with_timeout(paths, timeout_secs)
-        except CompileTimeoutError:
-            err = {'error': 'Compile process took too long; '
-                            'max time is %s seconds' % timeout_secs}
-            return jsonify(err), 409
-        end_time = time.time()
-
-        with open(paths['netlist']) as f:
-            raw_netlist = f.read()
-
-        netlist = ivernetp.process_netlist.netlist_to_json(raw_netlist)
-
-        try:
-            with open(paths['waveform']) as f:
-                waveform = f.read()
-        except OSError:
-            waveform = None
-
-        return jsonify(stdout=stdout, waveform=waveform, netlist=netlist,
-                       seconds=end_time - start_time)
-
-    finally:
-        shutil.rmtree(temp_dir)
+        # Identical requests that arrive while this one is compiling share
+        # its result instead of starting their own compile.
+        output = in_flight.do(key, run_compile, key, request.json['module'],
+                              request.json['testbench'], timeout_secs,
+                              graph_format, outputs)
+    except CompileTimeoutError:
+        err = {'error': 'Compile process took too long; '
+                        'max time is %s seconds' % timeout_secs}
+        return jsonify(err), 409
+    except CompileError as e:
+        return jsonify({'error': str(e)}), 422
+    except CompileWorkerError as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify(**output)
 
 
 def main():
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key.
+
+    The first caller for a key runs the function. Callers that arrive with
+    the same key while it is running wait for it and get the same result, or
+    the same exception raised again. Once the call finishes the key is
+    forgotten, so nothing is cached past the in-flight window.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn, *args):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[key] = call
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn(*args)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    The asyncio counterpart of SingleFlight, for use from one event loop.
+
+    do() returns an awaitable for the shared result. The shared task is
+    shielded, so a caller that goes away doesn't cancel it for the others.
+    """
+    def __init__(self):
+        self.tasks = {}
+
+    def do(self, key, coro_fn, *args):
+        task = self.tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn(*args))
+            self.tasks[key] = task
+            task.add_done_callback(lambda _: self.tasks.pop(key, None))
+        return asyncio.shield(task)
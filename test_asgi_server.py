@@ -0,0 +1,149 @@
+import config
+import asgi_server
+from executors import RemoteExecutor
+
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+import asyncio
+import json
+import time
+
+import pytest
+import sure  # noqa
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    """Give every test its own semaphore and no result store."""
+    monkeypatch.setattr(asgi_server, 'compile_slots', None)
+    monkeypatch.setattr(asgi_server, 'result_store', None)
+    monkeypatch.setattr(asgi_server, 'remote_executor', None)
+
+
+async def request(method, url, body=None):
+    """
+    Drive one request through the ASGI app.
+    Returns a tuple: (status, body bytes)
+    """
+    scope = {'type': 'http', 'method': method, 'path': url}
+    messages = [{'type': 'http.request', 'body': body or b''}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_server.app(scope, receive, send)
+    return sent[0]['status'], sent[1]['body']
+
+
+def post_compile(data):
+    return request('POST', '/compile', json.dumps(data).encode('utf-8'))
+
+
+def test_routing():
+    """Make sure unknown paths, methods and preflights are handled."""
+    async def main():
+        return [(await request('GET', '/nope'))[0],
+                (await request('GET', '/compile'))[0],
+                (await request('OPTIONS', '/compile'))[0],
+                (await request('GET', '/'))[0]]
+
+    asyncio.run(main()).should.be.equal([404, 405, 200, 200])
+
+
+def test_bad_requests():
+    """Make sure invalid posts are rejected before compiling."""
+    async def main():
+        return [
+            (await request('POST', '/compile', b'not json'))[0],
+            (await post_compile({'module': 'm'}))[0],
+            (await post_compile({'module': 'm', 'testbench': 't',
+                                 'graph_format': 'nope'}))[0],
+            (await post_compile({'module': 'm', 'testbench': 't',
+                                 'outputs': ['nope']}))[0],
+        ]
+
+    asyncio.run(main()).should.be.equal([400, 400, 400, 400])
+
+
+def test_compile(fake_tools):
+    """Make sure only the requested outputs are returned."""
+    status, body = asyncio.run(post_compile(
+        {'module': 'm', 'testbench': 't', 'outputs': ['stdout', 'netlist']}))
+    status.should.be.equal(200)
+    output = json.loads(body.decode('utf-8'))
+    sorted(output).should.be.equal(['netlist', 'stdout'])
+    output['stdout'].should.be.equal('local\n')
+
+
+def test_compile_error(fake_tools):
+    """Make sure compile errors are reported without temp paths."""
+    status, body = asyncio.run(post_compile(
+        {'module': 'syntax_error', 'testbench': 't'}))
+    status.should.be.equal(422)
+    json.loads(body.decode('utf-8')).should.be.equal(
+        {'error': 'module.v:1: syntax error'})
+
+
+def test_timeout(fake_tools, monkeypatch):
+    """Make sure compiles past the timeout get a 409."""
+    monkeypatch.setattr(config.Compiler, 'COMPILE_TIMEOUT', 0.05)
+    status, _ = asyncio.run(post_compile(
+        {'module': 'slow', 'testbench': 't', 'outputs': ['stdout']}))
+    status.should.be.equal(409)
+
+
+def test_coalescing(fake_tools, monkeypatch):
+    """Make sure identical concurrent requests share one compile."""
+    monkeypatch.setattr(config.Compiler, 'COMPILE_TIMEOUT', 5)
+    data = {'module': 'slow', 'testbench': 't', 'outputs': ['stdout']}
+
+    async def main():
+        return await asyncio.gather(*[post_compile(data) for _ in range(4)])
+
+    responses = asyncio.run(main())
+    len(set(responses)).should.be.equal(1)
+    responses[0][0].should.be.equal(200)
+    with open(path.join(fake_tools, 'calls.log')) as f:
+        f.read().should.be.equal('iverilog\n')
+
+
+def test_remote_compiles_hold_no_threads(workers, monkeypatch):
+    """Make sure waiting remote compiles don't use executor threads."""
+    monkeypatch.setattr(config.Compiler, 'COMPILE_TIMEOUT', 5)
+    monkeypatch.setattr(asgi_server, 'remote_executor',
+                        RemoteExecutor([address for _, address in workers]))
+
+    async def main():
+        # One thread, so remote compiles waiting in threads would run one
+        # at a time
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(1))
+        return await asyncio.gather(*[
+            post_compile({'module': 'slow %s' % i, 'testbench': 't',
+                          'outputs': ['stdout']}) for i in range(8)])
+
+    start_time = time.time()
+    responses = asyncio.run(main())
+    (time.time() - start_time).should.be.lower_than(1.2)
+    stdouts = sorted(json.loads(body.decode('utf-8'))['stdout'].strip()
+                     for _, body in responses)
+    stdouts.should.be.equal(['a'] * 4 + ['b'] * 4)
+
+
+def test_remote_failover(workers, monkeypatch):
+    """Make sure remote compiles move off a worker that is down."""
+    executor = RemoteExecutor([address for _, address in workers])
+    monkeypatch.setattr(asgi_server, 'remote_executor', executor)
+    process, _ = workers[0]
+    process.kill()
+    process.wait()
+
+    status, body = asyncio.run(post_compile(
+        {'module': 'm', 'testbench': 't', 'outputs': ['stdout']}))
+    status.should.be.equal(200)
+    json.loads(body.decode('utf-8'))['stdout'].should.be.equal('b\n')
+    executor.workers[0].healthy.should.be.false
@@ -0,0 +1,113 @@
+import config
+from conftest import start_worker
+
+from executors import (compile_commands, compiler_message, make_paths,
+                       RemoteExecutor, CompileError,
+                       CompileTimeoutError, CompileWorkerError,
+                       DEFAULT_OUTPUTS)
+
+from multiprocessing.pool import ThreadPool
+import socket
+
+import sure  # noqa
+
+
+def test_compile_commands():
+    """Make sure vvp only runs, and only dumps, when it is needed."""
+    paths = make_paths('/tmp/x')
+    iverilog_cmd, vvp_cmd = compile_commands(paths, DEFAULT_OUTPUTS)
+    iverilog_cmd.should.contain('-N')
+    vvp_cmd.should_not.contain('-none')
+
+    iverilog_cmd, vvp_cmd = compile_commands(paths, ('stdout',))
+    iverilog_cmd.should_not.contain('-N')
+    vvp_cmd.should.contain('-none')
+
+    _, vvp_cmd = compile_commands(paths, ('netlist', 'timing'))
+    vvp_cmd.should.be.none
+
+
+def test_compiler_message():
+    """Make sure compile errors don't leak the server's temp dir."""
+    paths = make_paths('/tmp/x')
+    output = b'/tmp/x/module.v:3: syntax error\n'
+    compiler_message(output, paths).should.be.equal(
+        'module.v:3: syntax error')
+
+
+def test_remote_balancing(workers):
+    """Make sure concurrent jobs are spread across workers."""
+    executor = RemoteExecutor([address for _, address in workers])
+    pool = ThreadPool(4)
+    results = pool.map(lambda _: executor.compile('slow', 'tb', 2,
+                                                  ('stdout',)), range(4))
+    pool.close()
+    sorted(r['stdout'].strip() for r in results).should.be.equal(
+        ['a', 'a', 'b', 'b'])
+    for worker in executor.workers:
+        worker.in_flight.should.be.equal(0)
+
+
+def test_remote_failover(workers):
+    """Make sure jobs move to another worker when one goes down."""
+    executor = RemoteExecutor([address for _, address in workers])
+    process, _ = workers[0]
+    process.kill()
+    process.wait()
+    for _ in range(3):
+        result = executor.compile('fast', 'tb', 2, ('stdout', 'netlist'))
+        result['stdout'].strip().should.be.equal('b')
+        result['netlist'].should_not.be.none
+    executor.workers[0].healthy.should.be.false
+    executor.workers[1].healthy.should.be.true
+
+
+def test_remote_compile_error(workers):
+    """Make sure compile errors reach the caller without temp paths."""
+    executor = RemoteExecutor([address for _, address in workers])
+    executor.compile.when.called_with(
+        'syntax_error', 'tb', 2, ('stdout',)).should.throw(
+        CompileError, 'module.v:1: syntax error')
+    for worker in executor.workers:
+        worker.healthy.should.be.true
+
+
+def test_remote_read_timeout(workers, monkeypatch):
+    """Make sure a slow worker is a timeout, not a failover."""
+    monkeypatch.setattr(config.Compiler, 'REMOTE_TIMEOUT_SLACK', 0)
+    silent = socket.socket()
+    silent.bind(('127.0.0.1', 0))
+    silent.listen(1)
+    try:
+        executor = RemoteExecutor([silent.getsockname(), workers[0][1]])
+        executor.compile.when.called_with(
+            'fast', 'tb', 0.5, ('stdout',)).should.throw(
+            CompileTimeoutError)
+        executor.workers[0].healthy.should.be.true
+    finally:
+        silent.close()
+
+
+def test_remote_busy_worker(fake_tools):
+    """Make sure jobs beyond a worker's limit go to another worker."""
+    started = [start_worker(name, max_compiles=1) for name in ('a', 'b')]
+    try:
+        executor = RemoteExecutor([address for _, address in started])
+        pool = ThreadPool(3)
+        outcomes = pool.map(lambda i: run_compile(executor, 'slow %s' % i),
+                            range(3))
+        pool.close()
+        sorted(outcomes).should.be.equal(['a', 'b', 'busy'])
+        for worker in executor.workers:
+            worker.healthy.should.be.true
+    finally:
+        for process, _ in started:
+            process.kill()
+            process.wait()
+
+
+def run_compile(executor, module):
+    try:
+        return executor.compile(module, 'tb', 2, ('stdout',))['stdout'].strip()
+    except CompileWorkerError:
+        return 'busy'
@@ -0,0 +1,139 @@
+import result_store
+from result_store import ResultStore, content_hash
+
+from multiprocessing import Process
+from os import path
+import sqlite3
+
+import pytest
+import sure  # noqa
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(result_store.time, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def db_path(tmpdir):
+    return path.join(str(tmpdir), 'results.sqlite3')
+
+
+def test_content_hash():
+    """Make sure part boundaries change the hash."""
+    content_hash('ab', 'c').should_not.be.equal(content_hash('a', 'bc'))
+    content_hash('a', 'b').should.be.equal(content_hash('a', 'b'))
+
+
+def test_round_trip(db_path):
+    """Make sure stored values come back intact."""
+    store = ResultStore(db_path, ttl_secs=60, max_bytes=1000)
+    store.put('compile', 'k', {'stdout': 'hi', 'seconds': 0.5})
+    store.get('compile', 'k').should.be.equal({'stdout': 'hi',
+                                               'seconds': 0.5})
+    store.get('compile', 'missing').should.be.none
+    store.get('other', 'k').should.be.none
+
+
+def test_ttl(db_path, clock):
+    """Make sure entries expire after the TTL."""
+    store = ResultStore(db_path, ttl_secs=60, max_bytes=1000)
+    store.put('compile', 'k', 'value')
+    clock.now += 59
+    store.get('compile', 'k').should.be.equal('value')
+    clock.now += 2
+    store.get('compile', 'k').should.be.none
+
+
+def test_size_eviction(db_path, clock):
+    """Make sure the least recently read entries are evicted first."""
+    store = ResultStore(db_path, ttl_secs=3600, max_bytes=100,
+                        access_resolution_secs=0, evict_interval_secs=0)
+    for i in range(4):
+        clock.now += 1
+        store.put('compile', str(i), 'x' * 20)  # 22 bytes encoded
+    clock.now += 1
+    store.get('compile', '0')
+    clock.now += 1
+    store.put('compile', '4', 'x' * 20)
+
+    present = [store.get('compile', str(i)) is not None for i in range(5)]
+    present.should.be.equal([True, False, True, True, True])
+
+
+def test_eviction_is_periodic(db_path, clock):
+    """Make sure eviction only runs once per interval."""
+    store = ResultStore(db_path, ttl_secs=3600, max_bytes=50,
+                        evict_interval_secs=10)
+    for i in range(4):
+        store.put('compile', str(i), 'x' * 20)
+    present = [i for i in range(4) if store.get('compile', str(i))]
+    len(present).should.be.equal(4)
+    clock.now += 10
+    store.put('compile', '4', 'x' * 20)
+    present = [i for i in range(5) if store.get('compile', str(i))]
+    len(present).should.be.equal(2)
+
+
+def test_fails_open_when_locked(db_path):
+    """Make sure a locked database drops writes instead of raising."""
+    store = ResultStore(db_path, ttl_secs=60, max_bytes=1000,
+                        timeout_secs=0.1)
+    store.put('compile', 'old', 'value')
+    blocker = sqlite3.connect(db_path)
+    blocker.execute('BEGIN IMMEDIATE')
+    try:
+        store.put('compile', 'new', 'value')
+    finally:
+        blocker.rollback()
+        blocker.close()
+    store.get('compile', 'new').should.be.none
+    store.get('compile', 'old').should.be.equal('value')
+
+
+def test_fails_open_on_read_errors(db_path):
+    """Make sure read errors are reported as misses."""
+    store = ResultStore(db_path, ttl_secs=60, max_bytes=1000)
+    store.put('compile', 'k', 'value')
+    conn = sqlite3.connect(db_path)
+    conn.execute('DROP TABLE results')
+    conn.commit()
+    conn.close()
+    store.get('compile', 'k').should.be.none
+
+
+def write_and_read(db_path, worker, count):
+    store = ResultStore(db_path, ttl_secs=60, max_bytes=10 ** 6,
+                        timeout_secs=10, evict_interval_secs=0)
+    for i in range(count):
+        store.put('compile', '%s-%s' % (worker, i), [worker, i])
+        if store.get('compile', '%s-%s' % (worker, i)) != [worker, i]:
+            raise SystemExit(1)
+
+
+def test_concurrent_processes(db_path):
+    """Make sure several processes can share one store."""
+    ResultStore(db_path, ttl_secs=60, max_bytes=10 ** 6)
+    processes = [Process(target=write_and_read, args=(db_path, worker, 50))
+                 for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        process.exitcode.should.be.equal(0)
+
+    store = ResultStore(db_path, ttl_secs=60, max_bytes=10 ** 6)
+    for worker in range(4):
+        for i in range(50):
+            store.get('compile', '%s-%s' % (worker, i)).should.be.equal(
+                [worker, i])
@@ -0,0 +1,121 @@
+import config
+import server
+from result_store import ResultStore
+from single_flight import SingleFlight
+
+from os import path
+import threading
+
+import pytest
+import sure  # noqa
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    """Give every test its own single-flight table and no result store."""
+    monkeypatch.setattr(server, 'in_flight', SingleFlight())
+    monkeypatch.setattr(server, 'result_store', None)
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+@pytest.fixture
+def store(tmpdir, monkeypatch):
+    store = ResultStore(path.join(str(tmpdir), 'results.sqlite3'),
+                        ttl_secs=60, max_bytes=10 ** 6)
+    monkeypatch.setattr(server, 'result_store', store)
+    return store
+
+
+def iverilog_calls(fake_tools):
+    try:
+        with open(path.join(fake_tools, 'calls.log')) as f:
+            return len(f.readlines())
+    except FileNotFoundError:
+        return 0
+
+
+def test_about(client):
+    """Make sure the about route reports the server's name."""
+    response = client.get('/')
+    response.status_code.should.be.equal(200)
+    response.get_json()['name'].should.be.equal(config.Metadata.NAME)
+
+
+def test_bad_requests(client, fake_tools):
+    """Make sure invalid posts are rejected before compiling."""
+    for data in ({'module': 'm'},
+                 {'module': 'm', 'testbench': 't', 'graph_format': 'nope'},
+                 {'module': 'm', 'testbench': 't', 'outputs': 'stdout'},
+                 {'module': 'm', 'testbench': 't', 'outputs': ['nope']}):
+        client.post('/compile', json=data).status_code.should.be.equal(400)
+    iverilog_calls(fake_tools).should.be.equal(0)
+
+
+def test_output_filtering(client, fake_tools):
+    """Make sure only the requested outputs are returned."""
+    response = client.post('/compile', json={
+        'module': 'm', 'testbench': 't', 'outputs': ['stdout', 'netlist']})
+    response.status_code.should.be.equal(200)
+    output = response.get_json()
+    sorted(output).should.be.equal(['netlist', 'stdout'])
+    output['stdout'].should.be.equal('local\n')
+
+    output = client.post('/compile', json={
+        'module': 'm', 'testbench': 't'}).get_json()
+    sorted(output).should.be.equal(['netlist', 'seconds', 'stdout',
+                                    'waveform'])
+
+
+def test_compile_error_not_cached(client, fake_tools, store):
+    """Make sure compile errors are a 422 and are compiled again."""
+    data = {'module': 'syntax_error', 'testbench': 't'}
+    for _ in range(2):
+        response = client.post('/compile', json=data)
+        response.status_code.should.be.equal(422)
+        response.get_json().should.be.equal(
+            {'error': 'module.v:1: syntax error'})
+    iverilog_calls(fake_tools).should.be.equal(2)
+
+
+def test_result_store(client, fake_tools, store):
+    """Make sure results are served from the store once compiled."""
+    data = {'module': 'm', 'testbench': 't', 'outputs': ['stdout']}
+    first = client.post('/compile', json=data).get_json()
+    second = client.post('/compile', json=data).get_json()
+    second.should.be.equal(first)
+    iverilog_calls(fake_tools).should.be.equal(1)
+
+    data['outputs'] = ['stdout', 'netlist']
+    client.post('/compile', json=data).status_code.should.be.equal(200)
+    iverilog_calls(fake_tools).should.be.equal(2)
+
+
+def test_timeout(client, fake_tools, monkeypatch):
+    """Make sure compiles past the timeout get a 409."""
+    monkeypatch.setattr(config.Compiler, 'COMPILE_TIMEOUT', 0.05)
+    response = client.post('/compile', json={
+        'module': 'slow', 'testbench': 't', 'outputs': ['stdout']})
+    response.status_code.should.be.equal(409)
+
+
+def test_coalescing(fake_tools, monkeypatch):
+    """Make sure identical concurrent requests share one compile."""
+    monkeypatch.setattr(config.Compiler, 'COMPILE_TIMEOUT', 5)
+    data = {'module': 'slow', 'testbench': 't', 'outputs': ['stdout']}
+    responses = []
+
+    def post():
+        response = server.app.test_client().post('/compile', json=data)
+        responses.append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=post) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    responses.should.be.equal([(200, {'stdout': 'local\n'})] * 4)
+    iverilog_calls(fake_tools).should.be.equal(1)
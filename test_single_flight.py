@@ -0,0 +1,141 @@
+from single_flight import SingleFlight, AsyncSingleFlight
+
+import asyncio
+import threading
+import time
+
+import pytest
+import sure  # noqa
+
+
+def run_concurrently(fn, count):
+    """
+    Call fn from count threads at once.
+    Return what each call returned or raised, in no particular order.
+    """
+    outcomes = []
+
+    def target():
+        try:
+            outcomes.append(fn())
+        except BaseException as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_followers_share_result():
+    """Make sure concurrent callers share one call and its result."""
+    flight = SingleFlight()
+    calls = []
+
+    def slow_double(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return x * 2
+
+    outcomes = run_concurrently(lambda: flight.do('k', slow_double, 21), 8)
+    outcomes.should.be.equal([42] * 8)
+    len(calls).should.be.equal(1)
+    flight.calls.should.be.empty
+
+
+def test_followers_share_exception():
+    """Make sure concurrent callers all get the leader's exception."""
+    flight = SingleFlight()
+
+    def slow_fail():
+        time.sleep(0.2)
+        raise ValueError('boom')
+
+    outcomes = run_concurrently(lambda: flight.do('k', slow_fail), 5)
+    len(outcomes).should.be.equal(5)
+    for outcome in outcomes:
+        outcome.should.be.a(ValueError)
+    len(set(id(o) for o in outcomes)).should.be.equal(1)
+    flight.calls.should.be.empty
+
+
+def test_base_exception_reaches_followers():
+    """Make sure exceptions outside Exception are shared too."""
+    flight = SingleFlight()
+
+    def slow_exit():
+        time.sleep(0.2)
+        raise SystemExit(1)
+
+    outcomes = run_concurrently(lambda: flight.do('k', slow_exit), 3)
+    for outcome in outcomes:
+        outcome.should.be.a(SystemExit)
+
+
+def test_key_cleared_after_call():
+    """Make sure a finished call isn't reused by later callers."""
+    flight = SingleFlight()
+    results = iter([1, 2])
+    flight.do('k', lambda: next(results)).should.be.equal(1)
+    flight.do('k', lambda: next(results)).should.be.equal(2)
+    flight.calls.should.be.empty
+
+
+def test_async_followers_share_result():
+    """Make sure concurrent coroutines share one call and its result."""
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow_double(x):
+        calls.append(x)
+        await asyncio.sleep(0.1)
+        return x * 2
+
+    async def main():
+        return await asyncio.gather(
+            *[flight.do('k', slow_double, 21) for _ in range(8)])
+
+    asyncio.run(main()).should.be.equal([42] * 8)
+    len(calls).should.be.equal(1)
+    flight.tasks.should.be.empty
+
+
+def test_async_followers_share_exception():
+    """Make sure concurrent coroutines all get the leader's exception."""
+    flight = AsyncSingleFlight()
+
+    async def slow_fail():
+        await asyncio.sleep(0.1)
+        raise ValueError('boom')
+
+    async def main():
+        return await asyncio.gather(
+            *[flight.do('k', slow_fail) for _ in range(4)],
+            return_exceptions=True)
+
+    outcomes = asyncio.run(main())
+    for outcome in outcomes:
+        outcome.should.be.a(ValueError)
+    flight.tasks.should.be.empty
+
+
+def test_async_cancelled_caller_keeps_call_running():
+    """Make sure one caller going away doesn't cancel the shared call."""
+    flight = AsyncSingleFlight()
+
+    async def slow_value():
+        await asyncio.sleep(0.1)
+        return 'done'
+
+    async def main():
+        first = asyncio.ensure_future(flight.do('k', slow_value))
+        second = flight.do('k', slow_value)
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    asyncio.run(main()).should.be.equal('done')
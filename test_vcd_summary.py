@@ -0,0 +1,122 @@
+from vcd_summary import summarize_vcd, extend_vector
+
+import sure  # noqa
+
+
+VCD = """$date today $end
+$timescale 1ns $end
+$scope module tb $end
+$var reg 1 ! clk $end
+$var wire 4 " q [3:0] $end
+$var real 64 # r $end
+$scope module u $end
+$var wire 1 ! c $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+#0
+$dumpvars
+x!
+bx "
+r0 #
+$end
+#5
+1!
+b1 "
+#10
+0!
+b101 "
+r1.5 #
+#15
+1!
+bz "
+"""
+
+
+def summarize(text):
+    summary = summarize_vcd(text.splitlines(True))
+    return summary, {s['name']: s for s in summary['signals']}
+
+
+def test_extend_vector():
+    """Make sure vectors are extended the way VCD specifies."""
+    extend_vector('1', 4).should.be.equal('0001')
+    extend_vector('x1', 4).should.be.equal('xxx1')
+    extend_vector('Z', 2).should.be.equal('zz')
+    extend_vector('0101', 4).should.be.equal('0101')
+
+
+def test_summary():
+    """Make sure toggles, first times, x/z changes and finals are right."""
+    summary, signals = summarize(VCD)
+    summary['timescale'].should.be.equal('1ns')
+    summary['end_time'].should.be.equal(15)
+    list(signals).should.be.equal(['tb.clk', 'tb.q', 'tb.r'])
+
+    clk = signals['tb.clk']
+    clk['aliases'].should.be.equal(['tb.u.c'])
+    clk['width'].should.be.equal(1)
+    clk['final'].should.be.equal('1')
+    clk['toggles'].should.be.equal(3)
+    clk['xz_changes'].should.be.equal(1)
+    clk['first_times'].should.be.equal({'x': 0, '1': 5, '0': 10})
+
+    q = signals['tb.q']
+    q['final'].should.be.equal('zzzz')
+    q['toggles'].should.be.equal(3)
+    q['xz_changes'].should.be.equal(2)
+    q['first_times'].should.be.equal(
+        {'xxxx': 0, '0001': 5, '0101': 10, 'zzzz': 15})
+
+    r = signals['tb.r']
+    r['final'].should.be.equal('1.5')
+    r['toggles'].should.be.equal(1)
+
+
+def test_truncated_dump():
+    """Make sure a dump cut off mid-value is summarized up to the cut."""
+    for cut in ('b1', 'b', '#'):
+        summary, signals = summarize(VCD + '#20\n0!\n' + cut)
+        signals['tb.clk']['final'].should.be.equal('0')
+        signals['tb.q']['final'].should.be.equal('zzzz')
+    summary['end_time'].should.be.equal(20)
+
+
+def test_dumpoff_ignored():
+    """Make sure the x values $dumpoff writes aren't counted."""
+    summary, signals = summarize(VCD + """#20
+$dumpoff
+x!
+bx "
+$end
+#30
+$dumpon
+1!
+b11 "
+$end
+""")
+    clk = signals['tb.clk']
+    clk['final'].should.be.equal('1')
+    clk['toggles'].should.be.equal(3)
+    clk['xz_changes'].should.be.equal(1)
+
+    q = signals['tb.q']
+    q['final'].should.be.equal('0011')
+    q['toggles'].should.be.equal(4)
+    q['xz_changes'].should.be.equal(2)
+    q['first_times']['0011'].should.be.equal(30)
+
+
+def test_malformed_header():
+    """Make sure bad declarations end the summary instead of raising."""
+    header = '$timescale 1ns $end\n$scope module tb $end\n'
+    declarations = ['$scope module $end\n',
+                    '$var wire 1 ! $end\n',
+                    '$var wire x ! a $end\n',
+                    '$upscope $end\n$upscope $end\n']
+    for declaration in declarations:
+        summary, signals = summarize(header + '$var reg 1 % ok $end\n' +
+                                     declaration + '#5\n1%\n')
+        summary['timescale'].should.be.equal('1ns')
+        list(signals).should.be.equal(['tb.ok'])
+        signals['tb.ok']['final'].should.be.none
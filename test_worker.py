@@ -0,0 +1,57 @@
+import config
+import worker
+
+import threading
+
+import pytest
+import sure  # noqa
+
+
+@pytest.fixture
+def compiles(monkeypatch):
+    """Record executor.compile calls instead of compiling."""
+    calls = []
+
+    def compile(module, testbench, timeout_secs, outputs):
+        calls.append((module, testbench, timeout_secs, outputs))
+        return {'stdout': 'ok'}
+
+    monkeypatch.setattr(worker.executor, 'compile', compile)
+    return calls
+
+
+def compile_request(**fields):
+    message = {'op': 'compile', 'module': 'm', 'testbench': 't'}
+    message.update(fields)
+    return message
+
+
+def test_timeout_capped(compiles):
+    """Make sure requests can't raise the worker's own timeout."""
+    worker.handle_message(compile_request(timeout=3600))['ok'].should.be.true
+    worker.handle_message(compile_request(timeout=0.1))['ok'].should.be.true
+    [c[2] for c in compiles].should.be.equal(
+        [config.Compiler.COMPILE_TIMEOUT, 0.1])
+
+
+def test_invalid_requests(compiles):
+    """Make sure malformed requests are rejected without compiling."""
+    for message in ([], {'op': 'format'},
+                    compile_request(module=None),
+                    compile_request(timeout='10'),
+                    compile_request(timeout=-1),
+                    compile_request(timeout=True),
+                    compile_request(outputs='stdout'),
+                    compile_request(outputs=['stdout', 'core'])):
+        worker.handle_message(message)['error'].should.be.equal('invalid')
+    compiles.should.be.empty
+
+
+def test_busy(compiles, monkeypatch):
+    """Make sure compiles past the limit are turned away."""
+    monkeypatch.setattr(worker, 'compile_slots', threading.BoundedSemaphore(1))
+    worker.compile_slots.acquire()
+    worker.handle_message(compile_request())['error'].should.be.equal('busy')
+    worker.compile_slots.release()
+    worker.handle_message(compile_request())['ok'].should.be.true
+    len(compiles).should.be.equal(1)
@@ -0,0 +1,165 @@
+"""
+One-pass summaries of VCD waveform dumps.
+
+summarize_vcd() reads a dump token by token and keeps only a fixed amount of
+state per signal, so memory use doesn't grow with the length of the
+simulation.
+"""
+from collections import OrderedDict
+
+
+# Distinct values per signal whose first time is recorded. Further values
+# are still counted as toggles but get no first time.
+MAX_FIRST_TIMES = 16
+
+
+class SignalSummary:
+    """
+    Running summary of one VCD identifier code.
+
+    names: the hierarchical names declared for this code. Several variables
+        can share one code when they are connected.
+
+    width: the width of the signal, in bits.
+
+    value: the current value, as a string of 0, 1, x and z at full width,
+        or a number string for real variables. None before the first value.
+
+    toggles: changes of value after the first value.
+
+    xz_changes: changes to a value containing x or z.
+
+    first_times: maps values to the first time the signal held them.
+    """
+    def __init__(self, name, width):
+        self.names = [name]
+        self.width = width
+        self.value = None
+        self.toggles = 0
+        self.xz_changes = 0
+        self.first_times = {}
+
+    def change(self, value, time):
+        if value == self.value:
+            return
+        if self.value is not None:
+            self.toggles += 1
+        if 'x' in value or 'z' in value:
+            self.xz_changes += 1
+        if (value not in self.first_times and
+                len(self.first_times) < MAX_FIRST_TIMES):
+            self.first_times[value] = time
+        self.value = value
+
+    def to_dict(self):
+        return {'name': self.names[0], 'aliases': self.names[1:],
+                'width': self.width, 'final': self.value,
+                'toggles': self.toggles, 'xz_changes': self.xz_changes,
+                'first_times': self.first_times}
+
+    def __repr__(self):
+        return '<SignalSummary: "%s" = %s (%s toggles)>' % (
+            self.names[0], self.value, self.toggles)
+
+
+def extend_vector(bits, width):
+    """
+    Extend a VCD vector value to its full width. Values are left-extended
+    with 0 if they start with 1, or with their first bit otherwise.
+    """
+    bits = bits.lower()
+    if len(bits) >= width:
+        return bits
+    fill = '0' if bits[0] == '1' else bits[0]
+    return fill * (width - len(bits)) + bits
+
+
+def tokens(lines):
+    for line in lines:
+        for token in line.split():
+            yield token
+
+
+def read_until_end(token_stream):
+    """
+    Collect tokens up to the next $end keyword.
+    """
+    collected = []
+    for token in token_stream:
+        if token == '$end':
+            break
+        collected.append(token)
+    return collected
+
+
+def summarize_vcd(lines):
+    """
+    Summarize a VCD dump given as an iterable of lines, such as an open file.
+
+    The x values a $dumpoff section gives every signal are skipped, since
+    they don't come from the simulation. Testbenches control what ends up in
+    the dump, so parsing stops at the first malformed declaration or value,
+    and the dump is summarized up to that point.
+
+    Returns a dict:
+        timescale: the dump's timescale, e.g. '1ns', or None.
+        end_time: the last timestamp in the dump.
+        signals: a list of SignalSummary.to_dict() results, in declaration
+            order.
+    """
+    token_stream = tokens(lines)
+    signals = OrderedDict()
+    scopes = []
+    timescale = None
+    time = 0
+
+    for token in token_stream:
+        if token == '$scope':
+            scope = read_until_end(token_stream)
+            if len(scope) < 2:
+                break
+            scopes.append(scope[1])
+        elif token == '$upscope':
+            read_until_end(token_stream)
+            if not scopes:
+                break
+            scopes.pop()
+        elif token == '$var':
+            var = read_until_end(token_stream)
+            if len(var) < 4 or not var[1].isdigit():
+                break
+            width, code, name = int(var[1]), var[2], var[3]
+            full_name = '.'.join(scopes + [name])
+            if code in signals:
+                signals[code].names.append(full_name)
+            else:
+                signals[code] = SignalSummary(full_name, width)
+        elif token == '$timescale':
+            timescale = ''.join(read_until_end(token_stream))
+        elif token in ('$date', '$version', '$comment', '$dumpoff'):
+            read_until_end(token_stream)
+        elif token.startswith('$'):
+            # $enddefinitions, $dumpvars, $dumpall, $dumpon and the $end
+            # closing them carry no data of their own
+            continue
+        elif token[0] == '#':
+            if not token[1:].isdigit():
+                break
+            time = int(token[1:])
+        elif token[0] in 'bBrR':
+            value = token[1:]
+            code = next(token_stream, None)
+            if not value or code is None:
+                break
+            signal = signals.get(code)
+            if signal:
+                if token[0] in 'bB':
+                    value = extend_vector(value, signal.width)
+                signal.change(value, time)
+        else:
+            signal = signals.get(token[1:])
+            if signal:
+                signal.change(token[0].lower(), time)
+
+    return {'timescale': timescale, 'end_time': time,
+            'signals': [s.to_dict() for s in signals.values()]}
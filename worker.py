@@ -0,0 +1,119 @@
+import config
+
+from executors import (LocalExecutor, CompileError, CompileTimeoutError,
+                       parse_outputs, send_message, receive_message)
+
+import argparse
+import logging
+import os
+import socketserver
+import sys
+import threading
+
+
+executor = LocalExecutor()
+logger = logging.getLogger(__name__)
+compile_slots = threading.BoundedSemaphore(
+    config.Worker.MAX_CONCURRENT_COMPILES or os.cpu_count() or 1)
+
+
+def invalid(message):
+    return {'ok': False, 'error': 'invalid', 'message': message}
+
+
+def handle_message(message):
+    """
+    Run one request from a RemoteExecutor and build the response.
+
+    Requests look like this:
+        {"op": "ping"}
+        {"op": "compile", "module": ..., "testbench": ..., "timeout": ...,
+         "outputs": [...]}
+
+    The timeout is capped at this worker's config.Compiler.COMPILE_TIMEOUT,
+    whatever the request asks for. At most compile_slots compiles run at
+    once; requests beyond that get a "busy" error straight away so the
+    sender can try another worker.
+
+    Returns a dict with "ok" set, plus either "result" or "error" and
+    "message". "compile_error" errors are problems with the submitted
+    Verilog and their message is meant for the user; "worker" errors are
+    failures on this host and are only logged here.
+    """
+    if not isinstance(message, dict):
+        return invalid('Request must be a JSON object')
+    op = message.get('op')
+    if op == 'ping':
+        return {'ok': True}
+    if op != 'compile':
+        return invalid('Invalid op: %s' % op)
+
+    module = message.get('module')
+    testbench = message.get('testbench')
+    if not isinstance(module, str) or not isinstance(testbench, str):
+        return invalid('module and testbench must be strings')
+    timeout_secs = message.get('timeout', config.Compiler.COMPILE_TIMEOUT)
+    if (isinstance(timeout_secs, bool) or
+            not isinstance(timeout_secs, (int, float)) or timeout_secs <= 0):
+        return invalid('timeout must be a positive number')
+    timeout_secs = min(timeout_secs, config.Compiler.COMPILE_TIMEOUT)
+    outputs = parse_outputs(message)
+    if outputs is None:
+        return invalid('Invalid outputs: %s' % message['outputs'])
+
+    if not compile_slots.acquire(blocking=False):
+        return {'ok': False, 'error': 'busy', 'message':
+                'Compile worker is busy'}
+    try:
+        result = executor.compile(module, testbench, timeout_secs, outputs)
+    except CompileTimeoutError:
+        return {'ok': False, 'error': 'timeout', 'message':
+                'Compile process took too long'}
+    except CompileError as e:
+        return {'ok': False, 'error': 'compile_error', 'message': str(e)}
+    except Exception:
+        logger.exception('Compile failed')
+        return {'ok': False, 'error': 'worker', 'message':
+                'Compile worker error'}
+    finally:
+        compile_slots.release()
+    return {'ok': True, 'result': result}
+
+
+class CompileRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            message = receive_message(self.rfile)
+        except (ConnectionError, ValueError):
+            return
+        send_message(self.wfile, handle_message(message))
+
+
+class CompileWorkerServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def main():
+    global compile_slots
+    if sys.version_info[0] != 3:
+        print("This is a Python 3 script. You are running Python %s.%s.%s." %
+              sys.version_info[:3])
+        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Run a compile worker.')
+    parser.add_argument('--host', default=config.Worker.HOST)
+    parser.add_argument('--port', type=int, default=config.Worker.PORT)
+    parser.add_argument('--max-compiles', type=int,
+                        help='compiles to run at once (default: '
+                             'Worker.MAX_CONCURRENT_COMPILES, or the CPU '
+                             'count)')
+    args = parser.parse_args()
+    if args.max_compiles:
+        compile_slots = threading.BoundedSemaphore(args.max_compiles)
+    server = CompileWorkerServer((args.host, args.port),
+                                 CompileRequestHandler)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()